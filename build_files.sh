@@ -0,0 +1,9 @@
+#!/bin/sh
+# Build de los archivos estáticos en Vercel (@vercel/static-build, ver vercel.json):
+# collectstatic escribe en staticfiles_build/static los archivos con hash en el
+# nombre, sus versiones .gz/.br y el manifiesto que usa {% static %}.
+# Corre antes que @vercel/python, que incluye el manifiesto en la función
+# (includeFiles): sin él, {% static %} falla (ver main/staticfiles.py).
+set -e
+python3 -m pip install -r requirements.txt
+python3 manage.py collectstatic --noinput --clear
@@ -5,6 +5,25 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Despliegue ASGI
+---------------
+Las vistas de subida, eliminación, listados y descarga son async: bajo
+ASGI un mismo proceso mantiene cientos de subidas lentas en curso sin
+ocupar un hilo por petición (las subidas a Cloudinary usan httpx).
+
+Un proceso (desarrollo o contenedores pequeños):
+
+    uvicorn lideresas.asgi:application --host 0.0.0.0 --port 8000
+
+Producción con varios procesos supervisados por gunicorn:
+
+    gunicorn lideresas.asgi:application -k uvicorn.workers.UvicornWorker \
+        --workers 4 --timeout 300
+
+El tiempo de espera debe cubrir la subida más lenta (archivos de hasta
+100MB). La ruta WSGI (lideresas.wsgi, vercel_app.py) sigue funcionando:
+Django ejecuta las vistas async en un event loop por petición.
 """
 
 import os
@@ -0,0 +1,68 @@
+"""
+Configuración de DATABASES['default'] según el modo de conexión (DB_POOL_MODE).
+
+- 'persistent': cada proceso reutiliza su conexión hasta conn_max_age
+  segundos y la revisa antes de usarla (CONN_HEALTH_CHECKS). Sirve para
+  pocos workers de larga vida.
+- 'pool': pool de psycopg 3 dentro del proceso (Django 5.1+, solo
+  Postgres). Cada petición toma una conexión y la devuelve al terminar; el
+  pool mantiene entre min_size y max_size abiertas y descarta las rotas.
+- 'pgbouncer': detrás de PgBouncer (o del pooler de Neon/Supabase) en modo
+  transaction. Sin cursores del lado del servidor, que no sobreviven entre
+  transacciones; Django ya desactiva las sentencias preparadas de psycopg 3.
+  Conectarse al pooler es barato, así que por defecto no se reutiliza.
+- 'none': una conexión nueva por petición.
+
+En servidores sin estado (Vercel) conviene 'pgbouncer' o 'pool' con
+min_size bajo: 'persistent' deja una conexión ociosa por instancia hasta
+agotar el límite de Postgres.
+"""
+import importlib.util
+
+import dj_database_url
+import django
+from django.core.exceptions import ImproperlyConfigured
+
+
+POOL_MODES = ('persistent', 'pool', 'pgbouncer', 'none')
+
+POSTGRES_ENGINE = 'django.db.backends.postgresql'
+
+
+def pool_available():
+    return django.VERSION >= (5, 1) and importlib.util.find_spec('psycopg_pool') is not None
+
+
+def database_config(url, mode='persistent', conn_max_age=None, connect_timeout=10, pool=None):
+    """
+    Retorna el diccionario de conexión para `url`. `pool` son las opciones
+    de psycopg_pool.ConnectionPool (min_size, max_size, timeout, max_idle,
+    max_lifetime) y solo se usan en modo 'pool'.
+    """
+    if mode not in POOL_MODES:
+        raise ImproperlyConfigured(f'DB_POOL_MODE debe ser uno de {", ".join(POOL_MODES)}, no {mode!r}')
+    if mode in ('pool', 'none'):
+        # Con pool, Django exige CONN_MAX_AGE = 0: la conexión vuelve al pool
+        conn_max_age = 0
+    elif conn_max_age is None:
+        conn_max_age = 600 if mode == 'persistent' else 0
+
+    database = dj_database_url.parse(url, conn_max_age=conn_max_age, conn_health_checks=conn_max_age > 0)
+    postgres = database['ENGINE'] == POSTGRES_ENGINE
+    if mode in ('pool', 'pgbouncer') and not postgres:
+        raise ImproperlyConfigured(f'DB_POOL_MODE={mode} solo funciona con Postgres')
+
+    options = database.setdefault('OPTIONS', {})
+    if postgres:
+        # Sin esto, un Postgres caído deja las peticiones colgadas hasta el timeout del servidor
+        options.setdefault('connect_timeout', connect_timeout)
+    if mode == 'pool':
+        if not pool_available():
+            raise ImproperlyConfigured('DB_POOL_MODE=pool requiere Django 5.1+ y psycopg[pool]')
+        from psycopg_pool import ConnectionPool
+
+        # Revisar la conexión al prestarla, como CONN_HEALTH_CHECKS
+        options['pool'] = {'check': ConnectionPool.check_connection, **(pool or {})}
+    elif mode == 'pgbouncer':
+        database['DISABLE_SERVER_SIDE_CURSORS'] = True
+    return database
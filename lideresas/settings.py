@@ -12,12 +12,11 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 from decouple import config
-import dj_database_url
+from lideresas.database import database_config
 import os
-
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
+import sys
+import tempfile
+import warnings
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -32,6 +31,9 @@ SECRET_KEY = config('SECRET_KEY', default='django-insecure-0tgb5mg#$xx5pnq49nt&#
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = config('DEBUG', default=False, cast=bool)
 
+# Corriendo `manage.py test`
+TESTING = sys.argv[1:2] == ['test']
+
 ALLOWED_HOSTS = ['*']
 
 # Application definition
@@ -51,8 +53,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    #'whitenoise.middleware.WhiteNoiseMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -84,10 +87,24 @@ WSGI_APPLICATION = 'lideresas.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Modo de conexión (ver lideresas/database.py): 'persistent', 'pool',
+# 'pgbouncer' o 'none'. DB_CONN_MAX_AGE vacío usa el valor del modo.
+DB_POOL_MODE = config('DB_POOL_MODE', default='persistent')
 DATABASES = {
-    'default': dj_database_url.config(
-        default=config('DATABASE_URL', default='sqlite:///db.sqlite3'),
-        conn_max_age=600
+    'default': database_config(
+        config('DATABASE_URL', default='sqlite:///db.sqlite3'),
+        mode=DB_POOL_MODE,
+        conn_max_age=config('DB_CONN_MAX_AGE', default='', cast=lambda value: int(value) if value else None),
+        connect_timeout=config('DB_CONNECT_TIMEOUT', default=10, cast=int),
+        # Con varios workers el máximo de Postgres debe cubrir workers × DB_POOL_MAX_SIZE
+        pool={
+            'min_size': config('DB_POOL_MIN_SIZE', default=1, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=4, cast=int),
+            # Segundos esperando una conexión libre antes de fallar
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+            'max_idle': config('DB_POOL_MAX_IDLE', default=300, cast=float),
+            'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=1800, cast=float),
+        },
     )
 }
 
@@ -123,7 +140,17 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # Static files
 STATIC_URL = '/static/'
-STATIC_ROOT = BASE_DIR / 'staticfiles'
+# build_files.sh (build de Vercel) publica staticfiles_build/ en la raíz del sitio
+STATIC_ROOT = BASE_DIR / 'staticfiles_build' / 'static'
+# Sin el manifiesto de collectstatic, {% static %} falla en lugar de usar
+# nombres sin hash que quedarían cacheados como inmutables. Desarrollo y
+# pruebas no corren collectstatic y usan los nombres originales.
+STATICFILES_MANIFEST_REQUIRED = config(
+    'STATICFILES_MANIFEST_REQUIRED', default=not DEBUG and not TESTING, cast=bool
+)
+# Sin collectstatic STATIC_ROOT no existe y WhiteNoise lo avisa en cada
+# arranque; en producción la falta del manifiesto ya falla (arriba).
+warnings.filterwarnings('ignore', message='No directory at: ')
 
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'main', 'static'),
@@ -132,8 +159,19 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
-# Whitenoise para servir archivos estáticos
-#STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
+# Whitenoise para servir archivos estáticos: collectstatic agrega el hash del
+# contenido a cada nombre (styles.3f2a9c1b7d4e.css), escribe las versiones .gz
+# y .br, y {% static %} resuelve los nombres con hash desde el manifiesto.
+# Los archivos con hash se sirven con Cache-Control inmutable por 10 años
+# (ver main/staticfiles.py).
+STORAGES = {
+    'default': {
+        'BACKEND': 'cloudinary_storage.storage.MediaCloudinaryStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'main.staticfiles.StaticFilesStorage',
+    },
+}
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -142,35 +180,157 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Configuración de autenticación personalizada
 AUTH_USER_MODEL = 'main.CustomUser'
 
-# Ya no necesitamos backend personalizado
+# EmailBackend guarda la usuaria autenticada en el caché (ver main/backends.py
+# y AUTH_USER_CACHE_TIMEOUT más abajo).
+# ModelBackend queda para las sesiones iniciadas antes de usar EmailBackend.
+AUTHENTICATION_BACKENDS = [
+    'main.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 LOGIN_REDIRECT_URL = '/platform/'
 LOGOUT_REDIRECT_URL = '/login/'
 LOGIN_URL = '/login/'
 
-# Cloudinary Configuration
-cloudinary.config(
-    cloud_name=config('CLOUDINARY_CLOUD_NAME'),
-    api_key=config('CLOUDINARY_API_KEY'),
-    api_secret=config('CLOUDINARY_API_SECRET'),
-    secure=True
-)
-
+# Cloudinary Configuration. El SDK se importa y se configura con estas
+# credenciales la primera vez que se usa (main.storage.cloudinary_sdk)
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': config('CLOUDINARY_CLOUD_NAME'),
     'API_KEY': config('CLOUDINARY_API_KEY'),
     'API_SECRET': config('CLOUDINARY_API_SECRET'),
 }
 
-# Para Cloudinary SDK
-cloudinary.config(
-    cloud_name=config('CLOUDINARY_CLOUD_NAME'),
-    api_key=config('CLOUDINARY_API_KEY'),
-    api_secret=config('CLOUDINARY_API_SECRET'),
-    secure=True
+# Endpoint de subida directa desde el navegador. Vacío = API de Cloudinary;
+# en desarrollo/pruebas puede apuntar a un servidor falso local.
+CLOUDINARY_UPLOAD_URL = config('CLOUDINARY_UPLOAD_URL', default='')
+
+# Subidas simultáneas a Cloudinary por petición en upload_document
+UPLOAD_MAX_WORKERS = config('UPLOAD_MAX_WORKERS', default=4, cast=int)
+
+# Subidas reanudables por partes (/api/uploads/). Las partes se guardan en
+# disco local: con varias instancias, CHUNKED_UPLOAD_DIR debe ser un
+# directorio compartido (NFS, volumen) o el balanceador debe mandar cada
+# sesión siempre a la misma instancia. En Vercel las instancias no comparten
+# /tmp: si una parte cae en otra instancia, el servidor responde 409 con el
+# offset que realmente tiene y la subida recomienza; ahí conviene la subida
+# directa firmada a Cloudinary (sign_document_upload).
+CHUNKED_UPLOAD_DIR = config('CHUNKED_UPLOAD_DIR', default=os.path.join(tempfile.gettempdir(), 'lideresas-uploads'))
+# Por debajo del límite de 4.5 MB por petición de Vercel
+CHUNKED_UPLOAD_CHUNK_SIZE = config('CHUNKED_UPLOAD_CHUNK_SIZE', default=4 * 1024 * 1024, cast=int)
+CHUNKED_UPLOAD_EXPIRY_HOURS = config('CHUNKED_UPLOAD_EXPIRY_HOURS', default=24, cast=int)
+
+# Backend de almacenamiento de los documentos (ver main/storage.py):
+# 'main.storage.CloudinaryStorage' o 'main.storage.LocalStorage'
+DOCUMENT_STORAGE_BACKEND = config('DOCUMENT_STORAGE_BACKEND', default='main.storage.CloudinaryStorage')
+LOCAL_STORAGE_ROOT = config('LOCAL_STORAGE_ROOT', default=os.path.join(BASE_DIR, 'storage'))
+# '' (FileResponse), 'x-accel-redirect' (nginx) o 'x-sendfile' (Apache/lighttpd)
+LOCAL_STORAGE_OFFLOAD = config('LOCAL_STORAGE_OFFLOAD', default='')
+LOCAL_STORAGE_ACCEL_PREFIX = config('LOCAL_STORAGE_ACCEL_PREFIX', default='/protected-documents/')
+# URLs de Cloudinary firmadas y con vencimiento en lugar de las públicas guardadas
+DOCUMENT_SIGNED_URLS = config('DOCUMENT_SIGNED_URLS', default=False, cast=bool)
+DOCUMENT_SIGNED_URL_TTL = config('DOCUMENT_SIGNED_URL_TTL', default=3600, cast=int)
+DOCUMENT_SIGNED_URL_CACHE_SIZE = config('DOCUMENT_SIGNED_URL_CACHE_SIZE', default=4096, cast=int)
+# Tiempo máximo (segundos) de las llamadas HTTP directas al almacenamiento
+# (subidas async con httpx, lectura de originales para miniaturas y ZIP)
+STORAGE_HTTP_TIMEOUT = config('STORAGE_HTTP_TIMEOUT', default=300, cast=float)
+
+# Miniaturas WebP de imágenes y PDF (ver main/previews.py): lado mayor en
+# píxeles, calidad WebP y tamaño máximo del original para generarlas
+PREVIEW_SIZE = config('PREVIEW_SIZE', default=320, cast=int)
+PREVIEW_QUALITY = config('PREVIEW_QUALITY', default=75, cast=int)
+PREVIEW_MAX_SOURCE_SIZE = config('PREVIEW_MAX_SOURCE_SIZE', default=30 * 1024 * 1024, cast=int)
+# Cache-Control de las miniaturas servidas por LocalStorage
+PREVIEW_CACHE_SECONDS = config('PREVIEW_CACHE_SECONDS', default=86400, cast=int)
+
+# Exportación en ZIP (ver main/exports.py): archivos descargados a la vez y
+# bloques de 64 KB que cada descarga adelanta. La memoria por exportación
+# queda acotada en EXPORT_CONCURRENCY × EXPORT_BUFFER_CHUNKS × 64 KB.
+EXPORT_CONCURRENCY = config('EXPORT_CONCURRENCY', default=4, cast=int)
+EXPORT_BUFFER_CHUNKS = config('EXPORT_BUFFER_CHUNKS', default=16, cast=int)
+
+# Cola de trabajos en la BD (main/jobs.py) que ejecuta `manage.py run_jobs`
+JOBS_WORKER_CONCURRENCY = config('JOBS_WORKER_CONCURRENCY', default=4, cast=int)
+JOBS_POLL_SECONDS = config('JOBS_POLL_SECONDS', default=2, cast=float)
+JOBS_MAX_ATTEMPTS = config('JOBS_MAX_ATTEMPTS', default=8, cast=int)
+JOBS_RETRY_BASE_SECONDS = config('JOBS_RETRY_BASE_SECONDS', default=30, cast=int)
+JOBS_RETRY_MAX_SECONDS = config('JOBS_RETRY_MAX_SECONDS', default=6 * 3600, cast=int)
+# Plazo para terminar un trabajo reclamado antes de que otro worker lo retome
+JOBS_LEASE_SECONDS = config('JOBS_LEASE_SECONDS', default=300, cast=int)
+# Sin worker (Vercel), el cron de vercel.json llama a /api/jobs/run/ con
+# Authorization: Bearer <CRON_SECRET>; Vercel define CRON_SECRET y la envía
+# sola. Sin CRON_SECRET la ruta responde 404. En el plan Hobby los cron solo
+# pueden ser diarios: ahí conviene un worker o un cron externo.
+JOBS_CRON_SECRET = config('CRON_SECRET', default='')
+# Trabajos por llamada, para terminar dentro del tiempo máximo de la función
+JOBS_CRON_LIMIT = config('JOBS_CRON_LIMIT', default=25, cast=int)
+
+# Caché (listados versionados por usuario, ver main/caching.py).
+# CACHE_BACKEND: 'locmem' (desarrollo y pruebas; una copia por proceso),
+# 'file' (CACHE_LOCATION = directorio compartido) o 'redis' (CACHE_LOCATION = URL)
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': config(
+            'CACHE_LOCATION',
+            default=os.path.join(tempfile.gettempdir(), 'lideresas-cache') if CACHE_BACKEND == 'file' else ''
+        ),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
+    }
+}
+# Vigencia de los listados cacheados; la versión de la biblioteca los invalida antes
+LIBRARY_CACHE_TIMEOUT = config('LIBRARY_CACHE_TIMEOUT', default=300, cast=int)
+
+# Sesiones: con un caché compartido (file/redis) se leen del caché y la BD
+# solo recibe las escrituras (cached_db). Con locmem cada proceso tendría su
+# copia y un logout no llegaría a los demás, así que se quedan en la BD.
+# SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies no usa la BD.
+SESSION_ENGINE = config(
+    'SESSION_ENGINE',
+    default='django.contrib.sessions.backends.db' if CACHE_BACKEND == 'locmem'
+    else 'django.contrib.sessions.backends.cached_db'
 )
+# Lo mismo con la usuaria autenticada: con locmem, un cambio de contraseña o
+# una desactivación solo se vería en el proceso que la guardó. 0 = sin caché.
+AUTH_USER_CACHE_TIMEOUT = config('AUTH_USER_CACHE_TIMEOUT', default=0 if CACHE_BACKEND == 'locmem' else 60, cast=int)
+
+# Métricas en formato Prometheus en /metrics (ver main/metrics.py). Con
+# METRICS_TOKEN se exige la cabecera Authorization: Bearer <token>; sin
+# token la ruta solo responde con DEBUG, para no exponer las métricas.
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Logs de la aplicación: LOG_FORMAT 'json' (un objeto por línea) o 'text';
+# LOG_LEVEL DEBUG/INFO/WARNING/ERROR, u OFF para apagarlos (por defecto
+# en `manage.py test`, donde solo ensucian la salida)
+LOG_LEVEL = config('LOG_LEVEL', default='OFF' if TESTING else 'INFO').upper()
+LOG_FORMAT = config('LOG_FORMAT', default='json')
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'main.logs.JsonFormatter'},
+        'text': {'format': '%(asctime)s %(levelname)s %(name)s: %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'main.logs.BackgroundStreamHandler', 'formatter': LOG_FORMAT},
+        'null': {'class': 'logging.NullHandler'},
+    },
+    'loggers': {
+        'main': {
+            'handlers': ['null' if LOG_LEVEL == 'OFF' else 'console'],
+            'level': 'CRITICAL' if LOG_LEVEL == 'OFF' else LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
 
-# Media files
-DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+# Media files (almacenamiento 'default' de STORAGES)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
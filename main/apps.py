@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
 
 
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self):
+        from .backends import forget_cached_user
+        from .metrics import install_query_recorder
+        from .models import CustomUser
+        from .search import ensure_sqlite_triggers
+
+        post_migrate.connect(ensure_sqlite_triggers, sender=self)
+        connection_created.connect(install_query_recorder)
+        post_save.connect(forget_cached_user, sender=CustomUser)
+        post_delete.connect(forget_cached_user, sender=CustomUser)
@@ -1,9 +1,32 @@
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
 from .models import CustomUser
 
+
+def user_cache_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+def forget_cached_user(sender, instance, **kwargs):
+    """
+    Receptor de post_save/post_delete de CustomUser: descarta la copia
+    cacheada (cambios de contraseña, is_active, etc.). Se borra también al
+    confirmar la transacción para no quedarse con una copia leída antes.
+    """
+    key = user_cache_key(instance.pk)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
 class EmailBackend(ModelBackend):
     """
-    Backend personalizado para autenticar con email en lugar de username
+    Backend personalizado para autenticar con email en lugar de username.
+
+    get_user() se ejecuta en cada petición autenticada: guarda la usuaria
+    en el caché AUTH_USER_CACHE_TIMEOUT segundos para no consultar la BD
+    cada vez. Con 0 (el valor por defecto con locmem) no usa el caché.
     """
     def authenticate(self, request, username=None, password=None, **kwargs):
         try:
@@ -16,7 +39,23 @@ class EmailBackend(ModelBackend):
         return None
 
     def get_user(self, user_id):
-        try:
-            return CustomUser.objects.get(pk=user_id)
-        except CustomUser.DoesNotExist:
-            return None
\ No newline at end of file
+        if settings.AUTH_USER_CACHE_TIMEOUT <= 0:
+            return super().get_user(user_id)
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        if settings.AUTH_USER_CACHE_TIMEOUT <= 0:
+            return await super().aget_user(user_id)
+        key = user_cache_key(user_id)
+        user = await cache.aget(key)
+        if user is None:
+            user = await super().aget_user(user_id)
+            if user is not None:
+                await cache.aset(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
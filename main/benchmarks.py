@@ -0,0 +1,678 @@
+"""
+Benchmarks de las rutas de main/urls.py con datos sembrados.
+
+Para cada tamaño de SIZES se siembran N usuarias con M documentos y K
+categorías cada una, y se mide cada ruta con la primera usuaria: tiempo
+de pared (mediana de varias repeticiones, con el caché de listados vacío)
+y cantidad de consultas SQL. Cloudinary se reemplaza por FakeCloudinary,
+así que no hace falta red ni credenciales reales.
+
+`manage.py benchmark` corre la suite en una BD de prueba y la compara con
+BASELINE_PATH; `--update-baseline` la reescribe. Las consultas no pueden
+aumentar; el tiempo puede crecer hasta la tolerancia indicada.
+
+`manage.py benchmark_startup` mide aparte el arranque en frío de
+vercel_app (ver startup()) y lista los módulos más lentos de importar.
+`manage.py benchmark_connections` compara el costo de conectarse a la BD
+en cada petición según el modo de conexión (ver connection_cost()).
+"""
+import io
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.utils import ConnectionHandler
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from lideresas.database import POSTGRES_ENGINE, pool_available
+
+from . import jobs
+from . import storage as storage_module
+from .models import Category, CustomUser, Document, Tag, UploadSession, UserStats
+from .storage import cloudinary_sdk, get_storage
+
+
+BASELINE_PATH = Path(__file__).with_name('benchmark_baseline.json')
+
+# (usuarias, documentos por usuaria, categorías por usuaria)
+SIZES = {
+    'small': (3, 50, 5),
+    'medium': (10, 500, 20),
+    'large': (20, 2000, 40),
+}
+
+PASSWORD = 'clave-benchmark-123'
+
+# Contenido que FakeCloudinary entrega para los archivos sembrados
+SEEDED_CONTENT = b'%PDF-1.4 benchmark\n' * 512
+
+CRON_SECRET = 'cron-benchmark'
+METRICS_TOKEN = 'metricas-benchmark'
+
+TAG_SETS = ('impuestos, 2024', 'contratos', 'salud, familia', 'trabajo, 2023', '')
+
+
+class FakeCloudinary:
+    """
+    Reemplaza las llamadas de red del SDK de Cloudinary por operaciones en
+    memoria. Las firmas (api_sign_request, verify_api_response_signature)
+    siguen siendo las reales porque no salen del proceso.
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.destroyed = set()
+        self._stack = None
+
+    def upload(self, file, public_id, folder='', **options):
+        public_id = f'{folder}{public_id}'
+        self.destroyed.discard(public_id)
+        self.files[public_id] = file if isinstance(file, str) else file.read()
+        return {'public_id': public_id, 'version': 1, 'resource_type': 'raw'}
+
+    def destroy(self, public_id, **options):
+        self.destroyed.add(public_id)
+        return {'result': 'ok' if self.files.pop(public_id, None) is not None else 'not found'}
+
+    def delete_resources(self, public_ids, **options):
+        self.destroyed.update(public_ids)
+        return {'deleted': {
+            public_id: 'deleted' if self.files.pop(public_id, None) is not None else 'not_found'
+            for public_id in public_ids
+        }}
+
+    def explicit(self, public_id, **options):
+        content = self.files.get(public_id, SEEDED_CONTENT)
+        size = os.path.getsize(content) if isinstance(content, str) else len(content)
+        return {'public_id': public_id, 'version': 1, 'bytes': size}
+
+    @staticmethod
+    def cloudinary_url(public_id, flags=None, **options):
+        prefix = 'raw/upload/fl_attachment' if flags == 'attachment' else 'raw/upload'
+        return f'https://cdn.example.test/{prefix}/{public_id}', options
+
+    @staticmethod
+    def private_download_url(public_id, format, **options):
+        return f'https://api.example.test/raw/download?public_id={public_id}&expires_at={options.get("expires_at")}'
+
+    def urlopen(self, url, timeout=None):
+        """CDN falso para open()/open_stream(): los archivos sembrados existen con un contenido fijo"""
+        parts = urlsplit(url)
+        if parts.query:
+            public_id = parse_qs(parts.query)['public_id'][0]
+        else:
+            public_id = parts.path.split('/raw/upload/', 1)[-1].removeprefix('fl_attachment/')
+        if public_id in self.destroyed:
+            raise urllib.error.HTTPError(url, 404, 'Not Found', {}, None)
+        content = self.files.get(public_id, SEEDED_CONTENT)
+        if isinstance(content, str):
+            with open(content, 'rb') as file:
+                content = file.read()
+        return io.BytesIO(content)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for target, replacement in (
+            ('cloudinary.uploader.upload', self.upload),
+            ('cloudinary.uploader.upload_large', self.upload),
+            ('cloudinary.uploader.destroy', self.destroy),
+            ('cloudinary.uploader.explicit', self.explicit),
+            ('cloudinary.api.delete_resources', self.delete_resources),
+            ('cloudinary.utils.cloudinary_url', self.cloudinary_url),
+            ('cloudinary.utils.private_download_url', self.private_download_url),
+            ('urllib.request.urlopen', self.urlopen),
+        ):
+            self._stack.enter_context(mock.patch(target, replacement))
+        # Sin httpx, aupload usa uploader.upload (ya reemplazado) en un hilo
+        self._stack.enter_context(mock.patch.object(storage_module, 'get_httpx', lambda: None))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+
+def seed(users, documents, categories):
+    """Crea las usuarias con sus categorías y documentos; retorna las usuarias"""
+    storage = get_storage()
+    created = []
+    for index in range(users):
+        user = CustomUser.objects.create_user(
+            email=f'bench{index}@example.com',
+            password=PASSWORD,
+            first_name='Bench',
+            last_name=str(index),
+        )
+        cats = Category.objects.bulk_create([
+            Category(user=user, name=f'Categoría {number}') for number in range(categories)
+        ])
+        docs = []
+        for number in range(documents):
+            public_id = f'documents/{user.id}_informe_{number}'
+            preview = f'documents/previews/{user.id}_informe_{number}.webp'
+            docs.append(Document(
+                user=user,
+                category=cats[number % categories] if cats else None,
+                name=f'informe {number}.pdf',
+                file=public_id,
+                size=1024 * (number + 1),
+                notes=f'Notas del informe {number}',
+                tags=TAG_SETS[number % len(TAG_SETS)],
+                preview=preview,
+                preview_url=storage.delivery_urls(preview)['delivery_url'],
+                **storage.delivery_urls(public_id)
+            ))
+        docs = Document.objects.bulk_create(docs, batch_size=500)
+        for tags in TAG_SETS:
+            Tag.attach(user, [doc for doc in docs if doc.tags == tags], tags)
+        UserStats.record_upload(user, docs)
+        created.append(user)
+    return created
+
+
+class Bench:
+    """Estado compartido por los escenarios: cliente, usuaria medida y contador para nombres únicos"""
+
+    def __init__(self, user, tmpdir):
+        self.user = user
+        self.tmpdir = tmpdir
+        self.client = Client()
+        self.counter = 0
+
+    def next(self):
+        self.counter += 1
+        return self.counter
+
+    def login(self):
+        # Un login nuevo actualiza last_login y vacía la usuaria cacheada
+        if self.client.session.get('_auth_user_id') != str(self.user.pk):
+            self.client.force_login(self.user)
+
+    def create_document(self, category=None):
+        number = self.next()
+        public_id = f'documents/{self.user.id}_extra_{number}'
+        doc = Document.objects.create(
+            user=self.user, category=category, name=f'extra {number}.pdf',
+            file=public_id, size=100, **get_storage().delivery_urls(public_id)
+        )
+        UserStats.record_upload(self.user, [doc])
+        return doc
+
+    def any_document(self):
+        return Document.objects.filter(user=self.user).order_by('id').first()
+
+
+# name de la URL -> función que prepara la petición: (bench) -> (método, ruta, kwargs)
+ROUTES = {}
+
+
+def route(name):
+    def register(func):
+        ROUTES[name] = func
+        return func
+    return register
+
+
+def _json(data):
+    return {'data': json.dumps(data), 'content_type': 'application/json'}
+
+
+@route('index')
+def _index(bench):
+    return 'get', reverse('index'), {}
+
+
+@route('register')
+def _register(bench):
+    bench.client.logout()
+    return 'post', reverse('register'), {'data': {
+        'nombre': 'Nueva', 'apellido': 'Usuaria',
+        'correo': f'nueva{bench.next()}@example.com', 'password': PASSWORD,
+    }}
+
+
+@route('login')
+def _login(bench):
+    bench.client.logout()
+    return 'post', reverse('login'), {'data': {'correo': bench.user.email, 'password': PASSWORD}}
+
+
+@route('bootstrap')
+def _bootstrap(bench):
+    return 'get', reverse('bootstrap'), {}
+
+
+@route('platform')
+def _platform(bench):
+    return 'get', reverse('platform'), {}
+
+
+@route('logout')
+def _logout(bench):
+    return 'get', reverse('logout'), {}
+
+
+@route('create_category')
+def _create_category(bench):
+    return 'post', reverse('create_category'), _json({'name': f'Nueva {bench.next()}'})
+
+
+@route('delete_category')
+def _delete_category(bench):
+    category = Category.objects.create(user=bench.user, name=f'Temporal {bench.next()}')
+    for _ in range(3):
+        bench.create_document(category)
+    return 'delete', reverse('delete_category', args=[category.id]) + '?delete_documents=1', {}
+
+
+@route('get_user_categories')
+def _get_user_categories(bench):
+    return 'get', reverse('get_user_categories'), {}
+
+
+@route('get_user_tags')
+def _get_user_tags(bench):
+    return 'get', reverse('get_user_tags'), {}
+
+
+@route('upload_document')
+def _upload_document(bench):
+    number = bench.next()
+    files = [SimpleUploadedFile(f'subida {number}-{index}.pdf', f'%PDF {number}-{index}'.encode()) for index in range(3)]
+    return 'post', reverse('upload_document'), {'data': {'files': files, 'tags': 'nuevo'}}
+
+
+@route('sign_document_upload')
+def _sign_document_upload(bench):
+    return 'post', reverse('sign_document_upload'), _json({'name': 'directo.pdf', 'size': 1024})
+
+
+@route('finalize_document_upload')
+def _finalize_document_upload(bench):
+    public_id = f'documents/{bench.user.id}_directo_{bench.next()}'
+    signature = cloudinary_sdk().utils.api_sign_request(
+        {'public_id': public_id, 'version': 1}, cloudinary_sdk().config().api_secret, signature_version=1
+    )
+    upload = {'public_id': public_id, 'version': 1, 'bytes': 1024, 'signature': signature}
+    return 'post', reverse('finalize_document_upload'), _json({'upload': upload, 'name': 'directo.pdf'})
+
+
+@route('get_documents')
+def _get_documents(bench):
+    return 'get', reverse('get_documents'), {}
+
+
+@route('get_recent_documents')
+def _get_recent_documents(bench):
+    return 'get', reverse('get_recent_documents'), {}
+
+
+@route('search_documents')
+def _search_documents(bench):
+    return 'get', reverse('search_documents') + '?q=informe', {}
+
+
+@route('download_document')
+def _download_document(bench):
+    return 'get', reverse('download_document', args=[bench.any_document().id]), {}
+
+
+@route('document_preview')
+def _document_preview(bench):
+    return 'get', reverse('document_preview', args=[bench.any_document().id]), {}
+
+
+@route('export_documents')
+def _export_documents(bench):
+    category = Category.objects.filter(user=bench.user).order_by('id').first()
+    return 'get', reverse('export_documents') + f'?category={category.id}', {}
+
+
+@route('delete_document')
+def _delete_document(bench):
+    return 'delete', reverse('delete_document', args=[bench.create_document().id]), {}
+
+
+@route('bulk_delete_documents')
+def _bulk_delete_documents(bench):
+    ids = [bench.create_document().id for _ in range(10)]
+    return 'post', reverse('bulk_delete_documents'), _json({'ids': ids})
+
+
+@route('metrics')
+def _metrics(bench):
+    return 'get', reverse('metrics'), {'headers': {'Authorization': f'Bearer {METRICS_TOKEN}'}}
+
+
+@route('run_jobs')
+def _run_jobs(bench):
+    jobs.enqueue_destroy([f'documents/{bench.user.id}_cron_{bench.next()}'])
+    return 'get', reverse('run_jobs'), {'headers': {'Authorization': f'Bearer {CRON_SECRET}'}}
+
+
+@route('create_upload_session')
+def _create_upload_session(bench):
+    return 'post', reverse('create_upload_session'), _json({'name': 'grande.pdf', 'size': 1024})
+
+
+@route('upload_session')
+def _upload_session(bench):
+    # Una sola parte que completa la sesión y registra el documento
+    content = f'%PDF sesión {bench.next()}'.encode()
+    session = UploadSession.objects.create(user=bench.user, name='grande.pdf', size=len(content))
+    return 'patch', reverse('upload_session', args=[session.id]), {
+        'data': content,
+        'content_type': 'application/offset+octet-stream',
+        'headers': {'Upload-Offset': '0'},
+    }
+
+
+def url_names():
+    from .urls import urlpatterns
+    return {pattern.name for pattern in urlpatterns if isinstance(pattern, URLPattern) and pattern.name}
+
+
+def _is_query(query):
+    # Los savepoints dependen de si hay una transacción por fuera (TestCase), no de la vista
+    return not query['sql'].upper().startswith(('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT'))
+
+
+def measure(bench, prepare):
+    """Ejecuta una petición preparada; retorna (segundos, consultas, status)"""
+    bench.login()
+    method, path, kwargs = prepare(bench)
+    # Listados sin cachear; la sesión y la usuaria siguen en el caché como en producción
+    UserStats.bump_version(bench.user)
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        response = getattr(bench.client, method)(path, **kwargs)
+        if response.streaming:
+            b''.join(response)
+        elapsed = time.perf_counter() - start
+    return elapsed, sum(1 for query in queries.captured_queries if _is_query(query)), response.status_code
+
+
+@contextmanager
+def environment():
+    """Ajustes aislados para medir: almacenamiento falso, caché local y hash de contraseñas barato"""
+    tmpdir = tempfile.mkdtemp()
+    try:
+        with FakeCloudinary(), override_settings(
+            DOCUMENT_STORAGE_BACKEND='main.storage.CloudinaryStorage',
+            DOCUMENT_SIGNED_URLS=False,
+            CLOUDINARY_UPLOAD_URL='',
+            CHUNKED_UPLOAD_DIR=tmpdir,
+            JOBS_CRON_SECRET=CRON_SECRET,
+            METRICS_TOKEN=METRICS_TOKEN,
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            # Un solo proceso: equivale a cached_db con un caché compartido
+            SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+            AUTH_USER_CACHE_TIMEOUT=60,
+            STATICFILES_MANIFEST_REQUIRED=False,
+            # Se mide el código de las vistas, no PBKDF2
+            PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+        ):
+            get_storage.cache_clear()
+            # Los ids y las versiones se repiten después de un flush: nada de otra corrida
+            cache.clear()
+            try:
+                yield tmpdir
+            finally:
+                get_storage.cache_clear()
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def run(size, repeat=5, routes=None):
+    """
+    Siembra los datos de `size` en la BD actual (que debe estar vacía) y
+    mide las rutas. Retorna {ruta: {'ms': mediana, 'queries': n, 'status': código}}.
+    """
+    results = {}
+    with environment() as tmpdir:
+        users = seed(*SIZES[size])
+        bench = Bench(users[0], tmpdir)
+        for name in routes or sorted(ROUTES):
+            prepare = ROUTES[name]
+            # La primera vuelta calienta plantillas, resolvers, etc.
+            measure(bench, prepare)
+            timings, counts, statuses = [], [], set()
+            for _ in range(repeat):
+                elapsed, count, status = measure(bench, prepare)
+                timings.append(elapsed)
+                counts.append(count)
+                statuses.add(status)
+            results[name] = {
+                'ms': round(statistics.median(timings) * 1000, 2),
+                'queries': max(counts),
+                'status': max(statuses),
+            }
+    return results
+
+
+def compare(results, baseline, tolerance=0.3, slack_ms=5.0, check_time=True):
+    """
+    Compara {tamaño: {ruta: medición}} con la línea base. Retorna la lista
+    de regresiones como texto; las rutas sin línea base no cuentan.
+    """
+    regressions = []
+    for size, routes in results.items():
+        for name, current in routes.items():
+            previous = baseline.get(size, {}).get(name)
+            if previous is None:
+                continue
+            if current['status'] >= 500:
+                regressions.append(f'{size}/{name}: respondió {current["status"]}')
+            if current['queries'] > previous['queries']:
+                regressions.append(
+                    f'{size}/{name}: {current["queries"]} consultas (línea base {previous["queries"]})'
+                )
+            limit = previous['ms'] * (1 + tolerance) + slack_ms
+            if check_time and current['ms'] > limit:
+                regressions.append(
+                    f'{size}/{name}: {current["ms"]} ms (línea base {previous["ms"]} ms, límite {limit:.2f} ms)'
+                )
+    return regressions
+
+
+# Arranque en frío: en Vercel cada instancia nueva importa vercel_app y
+# atiende su primera petición antes de responder; es lo que espera quien
+# llega después de un rato sin tráfico. startup() lo mide en procesos nuevos.
+
+# Se importan recién cuando se usan (subidas, miniaturas, Admin API). El
+# núcleo de cloudinary y cloudinary.uploader sí cargan al inicio: los
+# importa cloudinary.models, que define CloudinaryField.
+LAZY_MODULES = ('PIL', 'pypdfium2', 'httpx', 'cloudinary.api')
+
+STARTUP_SCRIPT = """
+import json, sys, time
+from wsgiref.util import setup_testing_defaults
+start = time.perf_counter()
+from vercel_app import app
+imported = time.perf_counter()
+environ = {'PATH_INFO': sys.argv[1]}
+setup_testing_defaults(environ)
+statuses = []
+b''.join(app(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+served = time.perf_counter()
+print('STARTUP ' + json.dumps({
+    'status': int(statuses[0].split()[0]),
+    'import_ms': (imported - start) * 1000,
+    'request_ms': (served - imported) * 1000,
+    'loaded': [name for name in json.loads(sys.argv[2]) if name in sys.modules],
+}), flush=True)
+"""
+
+
+def _spawn(path, *flags):
+    return subprocess.Popen(
+        [sys.executable, *flags, '-c', STARTUP_SCRIPT, path, json.dumps(LAZY_MODULES)],
+        cwd=settings.BASE_DIR,
+        # Sin exigir el manifiesto de collectstatic, que en local no suele estar
+        env={**os.environ, 'STATICFILES_MANIFEST_REQUIRED': 'False'},
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+
+
+def _startup_result(lines, stderr=''):
+    for line in lines:
+        if line.startswith('STARTUP '):
+            return json.loads(line[len('STARTUP '):])
+    raise RuntimeError(f'El proceso de arranque falló:\n{stderr}')
+
+
+def cold_start(path='/login/'):
+    """
+    Un arranque: desde que se lanza el intérprete hasta que vercel_app
+    respondió `path`. Retorna {'ms', 'import_ms', 'request_ms', 'status', 'loaded'}.
+    """
+    begin = time.perf_counter()
+    process = _spawn(path)
+    lines = []
+    for line in process.stdout:
+        lines.append(line)
+        if line.startswith('STARTUP '):
+            elapsed = time.perf_counter() - begin
+            break
+    stderr = process.communicate()[1]
+    result = _startup_result(lines, stderr)
+    result['ms'] = elapsed * 1000
+    return result
+
+
+def startup(path='/login/', repeat=5):
+    """Mediana de `repeat` arranques en frío; 'lazy_loaded' lista los LAZY_MODULES importados"""
+    runs = [cold_start(path) for _ in range(repeat)]
+    return {
+        'ms': round(statistics.median(run['ms'] for run in runs), 2),
+        'import_ms': round(statistics.median(run['import_ms'] for run in runs), 2),
+        'request_ms': round(statistics.median(run['request_ms'] for run in runs), 2),
+        'status': max(run['status'] for run in runs),
+        'lazy_loaded': sorted({name for run in runs for name in run['loaded']}),
+    }
+
+
+def import_profile(path='/login/'):
+    """
+    Corre un arranque con `python -X importtime` y retorna los módulos
+    importados como [{'module', 'self_ms', 'cumulative_ms', 'depth'}], en
+    orden de importación. depth 0 son los imports que nadie más pidió:
+    vercel_app y lo que se importa recién al atender la petición.
+    """
+    process = _spawn(path, '-X', 'importtime')
+    stdout, stderr = process.communicate()
+    _startup_result(stdout.splitlines(), stderr)
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        modules.append({
+            'module': name.strip(),
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+        })
+    return modules
+
+
+def compare_startup(result, baseline, tolerance=0.3, slack_ms=50.0, check_time=True):
+    """Como compare(), para el resultado de startup() y baseline['startup']"""
+    regressions = []
+    if result['status'] >= 500:
+        regressions.append(f'arranque: respondió {result["status"]}')
+    for name in result['lazy_loaded']:
+        regressions.append(f'arranque: {name} se importa antes de usarse')
+    previous = baseline.get('startup')
+    if previous is not None:
+        limit = previous['ms'] * (1 + tolerance) + slack_ms
+        if check_time and result['ms'] > limit:
+            regressions.append(
+                f'arranque: {result["ms"]} ms (línea base {previous["ms"]} ms, límite {limit:.2f} ms)'
+            )
+    return regressions
+
+
+def connection_modes(database):
+    """
+    Variantes de `database` (un diccionario de DATABASES) para comparar: sin
+    reutilizar la conexión, persistente y, en Postgres con psycopg[pool], con pool.
+    """
+    options = {key: value for key, value in database.get('OPTIONS', {}).items() if key != 'pool'}
+    base = {**database, 'OPTIONS': options, 'DISABLE_SERVER_SIDE_CURSORS': False}
+    modes = {
+        'none': {**base, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+        'persistent': {**base, 'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+    }
+    if database['ENGINE'] == POSTGRES_ENGINE and pool_available():
+        pool = database.get('OPTIONS', {}).get('pool') or {'min_size': 1, 'max_size': 4}
+        modes['pool'] = {**base, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'OPTIONS': {**options, 'pool': pool}}
+    return modes
+
+
+def connection_cost(requests=200, database=None):
+    """
+    Costo de la conexión por petición en cada modo de connection_modes():
+    {modo: {'ms': mediana, 'p95_ms': percentil 95, 'connections': conexiones
+    abiertas}}. Cada petición hace lo mismo que Django: close_old_connections
+    al empezar y al terminar, y en medio un SELECT 1.
+    """
+    results = {}
+    for mode, settings_dict in connection_modes(database or connections[DEFAULT_DB_ALIAS].settings_dict).items():
+        # Alias propio: los pools de Django se guardan por alias
+        alias = f'benchmark_{mode}'
+        handler = ConnectionHandler({DEFAULT_DB_ALIAS: settings_dict, alias: settings_dict})
+        db = handler[alias]
+        timings, opened = [], []
+        try:
+            for _ in range(requests):
+                begin = time.perf_counter()
+                db.close_if_unusable_or_obsolete()
+                with db.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+                # Se guarda la referencia para que id() no se repita entre conexiones
+                opened.append(db.connection)
+                db.close_if_unusable_or_obsolete()
+                timings.append(time.perf_counter() - begin)
+        finally:
+            db.close()
+            if mode == 'pool':
+                db.close_pool()
+        timings.sort()
+        results[mode] = {
+            'ms': round(statistics.median(timings) * 1000, 3),
+            'p95_ms': round(timings[int(len(timings) * 0.95) - 1] * 1000, 3),
+            'connections': len({id(conn) for conn in opened}),
+        }
+    return results
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True, ensure_ascii=False)
+        f.write('\n')
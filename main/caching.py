@@ -0,0 +1,95 @@
+"""
+Caché de los listados de la biblioteca por usuario.
+
+Cada respuesta se guarda bajo la `library_version` del usuario
+(UserStats), que sube en la misma transacción que cualquier subida,
+eliminación o cambio de categorías. Una versión nueva deja sin uso las
+entradas anteriores, que el backend de CACHES descarta al vencer.
+
+El ETag es el SHA-256 del cuerpo (fuerte), así un If-None-Match con el
+mismo contenido recibe 304 sin volver a enviarlo. Las respuestas en
+streaming no se guardan: llevan un ETag débil hecho de la usuaria, la
+versión y la URL, que se conoce antes de consultar, así que un 304 no
+recorre la biblioteca.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+
+from .models import UserStats
+from .storage import etag_matches
+
+
+def _path_hash(request):
+    return hashlib.md5(request.get_full_path().encode()).hexdigest()
+
+
+def library_cache_key(user, request, version):
+    return f'library:{user.pk}:{version}:{_path_hash(request)}'
+
+
+def library_etag(user, request, version):
+    """ETag débil de un listado: cambia con la versión de la biblioteca"""
+    return f'W/"{user.pk}-{version}-{_path_hash(request)}"'
+
+
+def _revalidate(response, etag):
+    response['ETag'] = etag
+    # El navegador puede guardar la respuesta pero debe revalidarla siempre
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _cached_response(request, cached):
+    body, etag, content_type = cached
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type=content_type)
+    return _revalidate(response, etag)
+
+
+def _cache_entry(body, response):
+    return body, f'"{hashlib.sha256(body).hexdigest()}"', response['Content-Type']
+
+
+def cache_library_response(view):
+    """
+    Decorador para vistas GET async de listados que dependen solo de la
+    biblioteca del usuario. Solo se cachean las respuestas normales (páginas,
+    categorías, recientes); las que van en streaming llevan library_etag().
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await view(request, *args, **kwargs)
+
+        # La versión se lee antes de consultar: si algo cambia mientras tanto,
+        # la respuesta queda bajo la versión vieja y nunca se sirve como nueva
+        user = await request.auser()
+        version = await sync_to_async(UserStats.library_version_for)(user)
+        key = library_cache_key(user, request, version)
+        cached = await cache.aget(key)
+        if cached is None:
+            # Solo una respuesta en streaming anterior tiene este ETag: con la
+            # misma versión, el 304 sale sin llamar a la vista
+            weak_etag = library_etag(user, request, version)
+            if etag_matches(request, weak_etag):
+                return _revalidate(HttpResponseNotModified(), weak_etag)
+            response = await view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            # Las respuestas en streaming (la biblioteca completa) no tienen
+            # tamaño acotado: guardarlas obligaría a cargarlas en memoria
+            if response.streaming:
+                return _revalidate(response, weak_etag)
+            cached = _cache_entry(response.content, response)
+            await cache.aset(key, cached, settings.LIBRARY_CACHE_TIMEOUT)
+        return _cached_response(request, cached)
+
+    return wrapper
@@ -0,0 +1,168 @@
+"""
+Exportación de documentos en un ZIP que se arma mientras se descarga.
+
+zip_documents() es un generador de bloques para StreamingHttpResponse:
+varios hilos leen los archivos del almacenamiento a la vez y cada uno
+adelanta como máximo EXPORT_BUFFER_CHUNKS bloques; el generador escribe
+las entradas del ZIP en orden, a medida que llegan los bloques. Ni los
+archivos ni el ZIP completo pasan por memoria o disco.
+
+Como en main/jobs.py, los hilos solo hablan con el almacenamiento: los
+documentos se consultan antes, en la vista.
+"""
+import logging
+import os
+import queue
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.utils import timezone
+
+from .storage import get_storage
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Formatos ya comprimidos: se guardan tal cual en lugar de gastar CPU en deflate
+STORED_EXTENSIONS = {
+    'jpg', 'jpeg', 'png', 'gif', 'webp', 'pdf', 'zip', 'rar', '7z', 'gz',
+    'docx', 'xlsx', 'pptx', 'odt', 'ods', 'odp', 'mp3', 'mp4', 'mov', 'avi',
+}
+
+# Fin de un archivo en la cola de bloques
+_DONE = object()
+
+
+class ZipBuffer:
+    """Destino de zipfile sin seek: acumula lo escrito hasta que el generador lo entrega"""
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def archive_name(name, used):
+    """Nombre de la entrada en el ZIP, sin carpetas y sin repetir: 'a.pdf', 'a (2).pdf'..."""
+    name = name.replace('/', '_').replace('\\', '_').strip() or 'documento'
+    base, ext = os.path.splitext(name)
+    candidate, n = name, 1
+    while candidate.lower() in used:
+        n += 1
+        candidate = f'{base} ({n}){ext}'
+    used.add(candidate.lower())
+    return candidate
+
+
+def _put(chunks, item, cancelled):
+    """Encola `item` esperando lugar; False si la descarga del ZIP se canceló"""
+    while not cancelled.is_set():
+        try:
+            chunks.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _fetch(storage, public_id, chunks, cancelled):
+    """Hilo lector: pasa el archivo bloque a bloque; termina con _DONE o la excepción"""
+    try:
+        with storage.open_stream(public_id) as source:
+            while chunk := source.read(CHUNK_SIZE):
+                if not _put(chunks, chunk, cancelled):
+                    return
+    except Exception as e:
+        _put(chunks, e, cancelled)
+        return
+    _put(chunks, _DONE, cancelled)
+
+
+def _entry(doc, name):
+    uploaded_at = timezone.localtime(doc.uploaded_at) if timezone.is_aware(doc.uploaded_at) else doc.uploaded_at
+    info = zipfile.ZipInfo(name, date_time=uploaded_at.timetuple()[:6])
+    extension = os.path.splitext(name)[1].lstrip('.').lower()
+    info.compress_type = zipfile.ZIP_STORED if extension in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+    # Tamaño esperado: zipfile decide con él si la entrada necesita ZIP64
+    info.file_size = doc.size or 0
+    return info
+
+
+def zip_documents(documents, storage=None, concurrency=None, buffer_chunks=None):
+    """
+    Genera el ZIP de `documents` (con name, file, size y uploaded_at).
+    Los archivos que no se pudieron leer se listan en ERRORES.txt al final.
+    """
+    storage = storage or get_storage()
+    concurrency = concurrency or settings.EXPORT_CONCURRENCY
+    buffer_chunks = buffer_chunks or settings.EXPORT_BUFFER_CHUNKS
+    cancelled = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='zip-export')
+    # Ventana de archivos en curso: el que se escribe y los siguientes que ya se leen
+    documents, window = iter(documents), deque()
+
+    def fetch_next():
+        doc = next(documents, None)
+        if doc is not None:
+            chunks = queue.Queue(maxsize=buffer_chunks)
+            executor.submit(_fetch, storage, str(doc.file), chunks, cancelled)
+            window.append((doc, chunks))
+
+    output = ZipBuffer()
+    archive = zipfile.ZipFile(output, 'w')
+    used, errors = set(), []
+    try:
+        for _ in range(concurrency):
+            fetch_next()
+        while window:
+            doc, chunks = window.popleft()
+            fetch_next()
+            item = chunks.get()
+            if isinstance(item, BaseException):
+                errors.append(f'{doc.name}: {item}')
+                continue
+            with archive.open(_entry(doc, archive_name(doc.name, used)), 'w') as entry:
+                while item is not _DONE:
+                    if isinstance(item, BaseException):
+                        # Ya se escribió parte: la entrada queda incompleta
+                        errors.append(f'{doc.name} (incompleto): {item}')
+                        break
+                    entry.write(item)
+                    if data := output.drain():
+                        yield data
+                    item = chunks.get()
+            if data := output.drain():
+                yield data
+
+        if errors:
+            logger.warning('Exportación con archivos faltantes', extra={'errors': len(errors)})
+            archive.writestr(
+                archive_name('ERRORES.txt', used),
+                'No se pudieron incluir estos documentos:\n' + '\n'.join(errors) + '\n',
+            )
+        archive.close()
+        yield output.drain()
+    finally:
+        # También si el cliente cortó la descarga: los hilos dejan de leer
+        cancelled.set()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,266 @@
+"""
+Cola de trabajos en la base de datos (outbox) para efectos en el almacenamiento.
+
+Las vistas encolan con enqueue() dentro de la misma transacción que el
+cambio en la BD: si la transacción se revierte, el trabajo tampoco existe,
+y si se confirma, el trabajo no se pierde aunque el almacenamiento falle.
+`manage.py run_jobs` los ejecuta; cada fallo reprograma el trabajo con
+backoff exponencial y tras JOBS_MAX_ATTEMPTS intentos queda en estado
+'dead' para revisarlo a mano.
+
+Como en upload_document, los hilos del worker solo hablan con el
+almacenamiento: los cambios de estado en la BD los hace el hilo principal.
+Un handler que necesita guardar algo retorna una función, que finish()
+ejecuta en el hilo principal dentro de una transacción.
+
+En Vercel no hay un proceso worker: el cron de vercel.json llama cada
+pocos minutos a /api/jobs/run/ (vista run_jobs), que ejecuta hasta
+JOBS_CRON_LIMIT trabajos por llamada.
+"""
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import previews
+from .models import Document, Job, UserStats
+from .storage import DELETE_BATCH_SIZE, get_storage
+
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+class JobError(Exception):
+    pass
+
+
+def handler(kind):
+    """Registra la función que ejecuta los trabajos de tipo `kind`"""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, **payload):
+    return Job.objects.create(kind=kind, payload=payload)
+
+
+def enqueue_destroy(public_ids):
+    """Encola el borrado de archivos del almacenamiento, un trabajo por lote de la API"""
+    public_ids = list(public_ids)
+    if not public_ids:
+        return []
+    if len(public_ids) <= DELETE_BATCH_SIZE:
+        # Un INSERT suelto: bulk_create abre su propia transacción fuera de
+        # una (los borrados se encolan con transaction.on_commit)
+        return [enqueue('destroy', public_ids=public_ids)]
+    return Job.objects.bulk_create([
+        Job(kind='destroy', payload={'public_ids': public_ids[start:start + DELETE_BATCH_SIZE]})
+        for start in range(0, len(public_ids), DELETE_BATCH_SIZE)
+    ])
+
+
+def enqueue_previews(documents):
+    """
+    Encola las miniaturas de los documentos recién creados (llamar dentro
+    de su transacción). Si otro documento con el mismo archivo ya tiene
+    miniatura, se copia en lugar de generarla de nuevo.
+    """
+    pending = {}
+    for doc in documents:
+        if previews.can_preview(doc.name, doc.size):
+            pending.setdefault(str(doc.file), []).append(doc)
+    if not pending:
+        return []
+
+    # Mismo contenido = mismo blob (índice de la FK); sin blob, mismo archivo
+    blob_ids = {docs[0].blob_id for docs in pending.values() if docs[0].blob_id}
+    files = [public_id for public_id, docs in pending.items() if not docs[0].blob_id]
+    user_ids = {doc.user_id for docs in pending.values() for doc in docs}
+    existing = {}
+    for blob_id, public_id, preview, preview_url in (
+        Document.objects.filter(Q(blob_id__in=blob_ids) | Q(user_id__in=user_ids, file__in=files))
+        .exclude(preview='')
+        .values_list('blob_id', 'file', 'preview', 'preview_url')
+    ):
+        existing[blob_id or str(public_id)] = (preview, preview_url)
+    new_jobs = []
+    for public_id, docs in pending.items():
+        found = existing.get(docs[0].blob_id or public_id)
+        if found:
+            preview, preview_url = found
+            Document.objects.filter(pk__in=[doc.pk for doc in docs]).update(preview=preview, preview_url=preview_url)
+            for doc in docs:
+                doc.preview, doc.preview_url = preview, preview_url
+        else:
+            new_jobs.append(Job(kind='preview', payload={
+                'user_id': docs[0].user_id,
+                'public_id': public_id,
+                'name': docs[0].name,
+                'checksum': docs[0].checksum,
+            }))
+    return Job.objects.bulk_create(new_jobs)
+
+
+@handler('destroy')
+def destroy(payload):
+    storage = get_storage()
+    public_ids = payload['public_ids']
+    # Un solo archivo va por la API de subidas, que no tiene el límite por hora de la Admin API
+    if len(public_ids) == 1:
+        storage.destroy(public_ids[0])
+        return
+    failed = storage.destroy_many(public_ids)
+    if failed:
+        # Reintentar solo los que fallaron
+        payload['public_ids'] = list(failed)
+        raise JobError('; '.join(f'{public_id}: {error}' for public_id, error in failed.items()))
+
+
+@handler('preview')
+def preview(payload):
+    storage = get_storage()
+    public_id = payload['public_id']
+    try:
+        with storage.open(public_id) as source:
+            data = previews.render(source, payload['name'])
+    except (previews.PreviewError, FileNotFoundError) as e:
+        # Archivo dañado o ya eliminado: el documento se queda con su ícono
+        logger.warning('Documento sin vista previa', extra={'public_id': public_id, 'error': str(e)})
+        return None
+
+    name = previews.preview_name(payload['user_id'], public_id, payload.get('checksum', ''))
+    preview_id = storage.upload(ContentFile(data, name=name.rsplit('/', 1)[-1]), name)
+    preview_url = storage.delivery_urls(preview_id)['delivery_url']
+
+    def save():
+        updated = Document.objects.filter(user_id=payload['user_id'], file=public_id).update(
+            preview=preview_id, preview_url=preview_url
+        )
+        if updated:
+            # Los listados cacheados no tienen la miniatura
+            UserStats.objects.filter(pk=payload['user_id']).update(library_version=F('library_version') + 1)
+        else:
+            # Los documentos se eliminaron mientras tanto
+            enqueue_destroy([preview_id])
+    return save
+
+
+def retry_delay(attempts):
+    """Backoff exponencial con un poco de azar para no reintentar todos a la vez"""
+    delay = min(settings.JOBS_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.JOBS_RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(1, 1.25))
+
+
+def claim(limit, kinds=None):
+    """
+    Reserva hasta `limit` trabajos listos para ejecutarse (solo de `kinds`,
+    si se indica). Un trabajo cuyo plazo venció sin llegar a finish() (el
+    worker se cayó) cuenta como intento fallido: sin intentos restantes pasa
+    a DEAD en lugar de volver a reservarse.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        abandoned = Job.objects.filter(
+            status=Job.RUNNING, run_at__lte=now, attempts__gte=settings.JOBS_MAX_ATTEMPTS
+        )
+        if kinds:
+            abandoned = abandoned.filter(kind__in=kinds)
+        dead = abandoned.update(status=Job.DEAD, last_error='Plazo vencido sin terminar (¿se cayó el worker?)')
+        if dead:
+            logger.error('Trabajos abandonados sin más reintentos', extra={'jobs': dead})
+
+        ready = Job.objects.select_for_update(skip_locked=True).filter(
+            status__in=[Job.PENDING, Job.RUNNING], run_at__lte=now
+        )
+        if kinds:
+            ready = ready.filter(kind__in=kinds)
+        jobs = list(ready.order_by('run_at')[:limit])
+        lease = now + timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=Job.RUNNING, run_at=lease, attempts=F('attempts') + 1
+        )
+    for job in jobs:
+        job.status, job.run_at, job.attempts = Job.RUNNING, lease, job.attempts + 1
+    return jobs
+
+
+def execute(job):
+    """
+    Ejecuta el trabajo; retorna (error, guardar): el error como texto (None
+    si terminó bien) y la función que retornó el handler, si la hay.
+    """
+    func = HANDLERS.get(job.kind)
+    if func is None:
+        return f'Tipo de trabajo desconocido: {job.kind}', None
+    try:
+        return None, func(job.payload)
+    except Exception as e:
+        return f'{type(e).__name__}: {e}', None
+
+
+def finish(job, error, save=None):
+    """
+    Guarda el resultado de un trabajo reclamado. Solo si el reclamo sigue
+    vigente (mismo plazo run_at, en ejecución): si venció y otro worker lo
+    retomó, o el trabajo ya no existe, el resultado se descarta sin pisar
+    nada. Retorna si el trabajo terminó bien.
+    """
+    with transaction.atomic():
+        claimed = Job.objects.select_for_update().filter(pk=job.pk, status=Job.RUNNING, run_at=job.run_at)
+        if not claimed.exists():
+            logger.warning('Trabajo retomado por otro worker, se descarta el resultado', extra={
+                'job_id': job.id, 'kind': job.kind,
+            })
+            return False
+        if error is None and save is not None:
+            try:
+                with transaction.atomic():
+                    save()
+            except Exception as e:
+                error = f'{type(e).__name__}: {e}'
+        if error is None:
+            claimed.delete()
+            return True
+
+        job.last_error = error
+        if job.attempts >= settings.JOBS_MAX_ATTEMPTS:
+            job.status = Job.DEAD
+            logger.error('Trabajo sin más reintentos', extra={'job_id': job.id, 'kind': job.kind, 'error': error})
+        else:
+            job.status = Job.PENDING
+            job.run_at = timezone.now() + retry_delay(job.attempts)
+            logger.warning('Trabajo fallido, se reintentará', extra={
+                'job_id': job.id, 'kind': job.kind, 'attempts': job.attempts, 'error': error,
+            })
+        claimed.update(status=job.status, run_at=job.run_at, last_error=job.last_error, payload=job.payload)
+    return False
+
+
+def run_pending(concurrency=1, limit=None, kinds=None):
+    """
+    Ejecuta los trabajos listos hasta vaciar la cola (o llegar a `limit`).
+    Con `kinds`, solo los de esos tipos. Retorna (terminados, fallidos).
+    """
+    done = failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while limit is None or done + failed < limit:
+            batch = concurrency if limit is None else min(concurrency, limit - done - failed)
+            jobs = claim(batch, kinds)
+            if not jobs:
+                break
+            for job, (error, save) in zip(jobs, executor.map(execute, jobs)):
+                if finish(job, error, save):
+                    done += 1
+                else:
+                    failed += 1
+    return done, failed
@@ -0,0 +1,40 @@
+"""
+Formato y salida de los logs de la aplicación (ver LOGGING en settings).
+
+JsonFormatter escribe un objeto JSON por línea con los campos pasados en
+`extra=`; BackgroundStreamHandler encola los registros y los escribe
+desde un hilo aparte, así una petición no espera a stdout/stderr.
+"""
+import atexit
+import json
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+# Atributos propios de LogRecord; el resto son los `extra=` del llamado
+RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S%z'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        data.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRS)
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class BackgroundStreamHandler(QueueHandler):
+    """Formatea en el hilo que registra y escribe en stderr desde otro hilo"""
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.listener = QueueListener(self.queue, logging.StreamHandler(stream))
+        self.listener.start()
+        atexit.register(self.listener.stop)
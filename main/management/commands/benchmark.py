@@ -0,0 +1,92 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from main import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide tiempo y consultas SQL de cada ruta con datos sembrados en una BD de prueba '
+        'y falla si empeoran respecto de la línea base'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size',
+            action='append',
+            choices=list(benchmarks.SIZES),
+            help='Tamaño de datos a medir (se puede repetir; por defecto todos)',
+        )
+        parser.add_argument(
+            '--route',
+            action='append',
+            choices=sorted(benchmarks.ROUTES),
+            help='Ruta a medir (se puede repetir; por defecto todas)',
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por ruta')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.3,
+            help='Aumento de tiempo permitido sobre la línea base (0.3 = 30%%)',
+        )
+        parser.add_argument(
+            '--slack-ms',
+            type=float,
+            default=5.0,
+            help='Milisegundos extra permitidos, para que las rutas muy rápidas no fallen por ruido',
+        )
+        parser.add_argument(
+            '--no-time',
+            action='store_true',
+            help='Compara solo las consultas (los tiempos dependen de la máquina)',
+        )
+        parser.add_argument(
+            '--update-baseline',
+            action='store_true',
+            help=f'Guarda los resultados en {benchmarks.BASELINE_PATH.name} en lugar de compararlos',
+        )
+
+    def handle(self, *args, **options):
+        sizes = options['size'] or list(benchmarks.SIZES)
+        missing = benchmarks.url_names() - benchmarks.ROUTES.keys()
+        if missing:
+            raise CommandError(f'Rutas sin escenario de benchmark: {", ".join(sorted(missing))}')
+
+        results = {}
+        setup_test_environment()
+        databases = setup_databases(verbosity=0, interactive=False)
+        try:
+            for size in sizes:
+                call_command('flush', interactive=False, verbosity=0)
+                self.stdout.write(f'== {size}: %d usuarias × %d documentos × %d categorías' % benchmarks.SIZES[size])
+                results[size] = benchmarks.run(size, repeat=options['repeat'], routes=options['route'])
+                for name, result in results[size].items():
+                    self.stdout.write(
+                        f'{name:<28} {result["ms"]:>9.2f} ms {result["queries"]:>4} consultas  [{result["status"]}]'
+                    )
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+
+        if options['update_baseline']:
+            baseline = benchmarks.load_baseline()
+            for size, routes in results.items():
+                baseline.setdefault(size, {}).update(routes)
+            benchmarks.save_baseline(baseline)
+            self.stdout.write(self.style.SUCCESS(f'Línea base actualizada: {benchmarks.BASELINE_PATH}'))
+            return
+
+        regressions = benchmarks.compare(
+            results,
+            benchmarks.load_baseline(),
+            tolerance=options['tolerance'],
+            slack_ms=options['slack_ms'],
+            check_time=not options['no_time'],
+        )
+        for regression in regressions:
+            self.stdout.write(self.style.ERROR(regression))
+        if regressions:
+            raise CommandError(f'{len(regressions)} regresiones respecto de la línea base')
+        self.stdout.write(self.style.SUCCESS('Sin regresiones respecto de la línea base'))
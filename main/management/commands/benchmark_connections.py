@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from main import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el costo de conectarse a la BD en cada petición sin reutilizar la conexión, '
+        'con conexiones persistentes y, en Postgres, con el pool de psycopg'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Peticiones simuladas por modo')
+
+    def handle(self, *args, **options):
+        results = benchmarks.connection_cost(options['requests'])
+        if 'pool' not in results:
+            self.stdout.write('El pool solo se mide con Postgres, Django 5.1+ y psycopg[pool] instalado')
+        for mode, result in results.items():
+            self.stdout.write(
+                f'{mode:<12} {result["ms"]:>9.3f} ms/petición (p95 {result["p95_ms"]:.3f} ms) '
+                f'{result["connections"]:>5} conexiones abiertas'
+            )
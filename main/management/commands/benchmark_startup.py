@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el arranque en frío de vercel_app (importar y atender la primera petición), '
+        'muestra qué módulos tardan más en importarse y falla si empeora respecto de la línea base'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/login/', help='Ruta de la primera petición')
+        parser.add_argument('--repeat', type=int, default=5, help='Arranques a medir')
+        parser.add_argument('--top', type=int, default=15, help='Módulos a listar por tiempo de importación propio')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.3,
+            help='Aumento de tiempo permitido sobre la línea base (0.3 = 30%%)',
+        )
+        parser.add_argument(
+            '--slack-ms',
+            type=float,
+            default=50.0,
+            help='Milisegundos extra permitidos, por el ruido de lanzar un intérprete',
+        )
+        parser.add_argument(
+            '--no-time',
+            action='store_true',
+            help='Revisa solo los módulos importados (los tiempos dependen de la máquina)',
+        )
+        parser.add_argument(
+            '--update-baseline',
+            action='store_true',
+            help=f'Guarda el resultado en {benchmarks.BASELINE_PATH.name} en lugar de compararlo',
+        )
+
+    def handle(self, *args, **options):
+        modules = benchmarks.import_profile(options['path'])
+        self.stdout.write('== Importaciones de primer nivel (ms acumulados)')
+        for module in modules:
+            if module['depth'] == 0 and module['cumulative_ms'] >= 1:
+                self.stdout.write(f'{module["module"]:<48} {module["cumulative_ms"]:>9.2f} ms')
+        self.stdout.write('== Módulos más lentos (ms propios)')
+        for module in sorted(modules, key=lambda m: m['self_ms'], reverse=True)[:options['top']]:
+            self.stdout.write(f'{module["module"]:<48} {module["self_ms"]:>9.2f} ms')
+
+        result = benchmarks.startup(options['path'], repeat=options['repeat'])
+        self.stdout.write(
+            f'== Arranque: {result["ms"]:.2f} ms (importar {result["import_ms"]:.2f} ms, '
+            f'primera petición {result["request_ms"]:.2f} ms)  [{result["status"]}]'
+        )
+
+        if options['update_baseline']:
+            baseline = benchmarks.load_baseline()
+            baseline['startup'] = {key: result[key] for key in ('ms', 'import_ms', 'request_ms', 'status')}
+            benchmarks.save_baseline(baseline)
+            self.stdout.write(self.style.SUCCESS(f'Línea base actualizada: {benchmarks.BASELINE_PATH}'))
+            return
+
+        regressions = benchmarks.compare_startup(
+            result,
+            benchmarks.load_baseline(),
+            tolerance=options['tolerance'],
+            slack_ms=options['slack_ms'],
+            check_time=not options['no_time'],
+        )
+        for regression in regressions:
+            self.stdout.write(self.style.ERROR(regression))
+        if regressions:
+            raise CommandError(f'{len(regressions)} regresiones respecto de la línea base')
+        self.stdout.write(self.style.SUCCESS('Sin regresiones respecto de la línea base'))
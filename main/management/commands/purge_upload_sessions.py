@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from main.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = 'Elimina las subidas por partes abandonadas y sus archivos temporales'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=settings.CHUNKED_UPLOAD_EXPIRY_HOURS,
+            help='Antigüedad mínima (desde la última parte recibida) para considerar abandonada una subida',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = UploadSession.objects.filter(updated_at__lt=cutoff)
+
+        count = 0
+        for session in stale.iterator():
+            session.discard_data()
+            count += 1
+        stale.delete()
+
+        self.stdout.write(self.style.SUCCESS(f'{count} subidas eliminadas'))
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+
+from main.models import UserStats
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye la tabla user_stats a partir de los documentos existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Solo compara la tabla con los valores recalculados y falla si hay diferencias',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            self.check_consistency({stats.user_id: stats for stats in UserStats.compute_all()})
+            return
+
+        with transaction.atomic():
+            # Con las filas bloqueadas, una subida o eliminación en curso espera
+            # y su F() se suma sobre el valor nuevo; lo que ya confirmó entra
+            # en el recálculo. Por eso las filas se actualizan en su lugar.
+            current = {stats.user_id: stats for stats in UserStats.objects.select_for_update()}
+            expected = {stats.user_id: stats for stats in UserStats.compute_all()}
+            fields = ('document_count', 'total_size', 'day', 'documents_on_day')
+            for user_id, stats in current.items():
+                want = expected.pop(user_id, None) or UserStats(user_id=user_id)
+                for field in fields:
+                    setattr(stats, field, getattr(want, field))
+            UserStats.objects.bulk_update(current.values(), fields, batch_size=500)
+            UserStats.objects.bulk_create(expected.values(), batch_size=500, ignore_conflicts=True)
+            # library_version nunca retrocede: volver a un número ya usado
+            # serviría listados cacheados viejos
+            UserStats.objects.update(library_version=F('library_version') + 1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'user_stats reconstruida: {len(current) + len(expected)} usuarios'
+        ))
+
+    def check_consistency(self, expected):
+        mismatches = []
+        current = {stats.user_id: stats for stats in UserStats.objects.all()}
+
+        for user_id in expected.keys() | current.keys():
+            want = expected.get(user_id) or UserStats(user_id=user_id)
+            have = current.get(user_id) or UserStats(user_id=user_id)
+            fields = ('document_count', 'total_size', 'documents_today')
+            diff = {
+                field: (getattr(have, field), getattr(want, field))
+                for field in fields
+                if getattr(have, field) != getattr(want, field)
+            }
+            if diff:
+                mismatches.append((user_id, diff))
+
+        for user_id, diff in mismatches:
+            details = ', '.join(f'{field}: {have} != {want}' for field, (have, want) in diff.items())
+            self.stdout.write(f'Usuario {user_id}: {details}')
+
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} usuarios con estadísticas inconsistentes')
+
+        self.stdout.write(self.style.SUCCESS('user_stats es consistente'))
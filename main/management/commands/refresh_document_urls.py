@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from main.models import Document, UserStats
+from main.storage import get_storage
+
+
+FIELDS = ['delivery_url', 'download_url', 'preview_url']
+
+
+class Command(BaseCommand):
+    help = 'Calcula y guarda las URLs de entrega, descarga y miniatura de los documentos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recalcula también los documentos que ya tienen URLs (p. ej. tras cambiar de cuenta de Cloudinary)',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        storage = get_storage()
+        documents = Document.objects.only('id', 'file', 'delivery_url', 'download_url', 'preview', 'preview_url').order_by('id')
+        if not options['all']:
+            documents = documents.filter(delivery_url='')
+
+        batch, count = [], 0
+        for document in documents.iterator(chunk_size=options['batch_size']):
+            urls = storage.delivery_urls(str(document.file))
+            document.delivery_url = urls['delivery_url']
+            document.download_url = urls['download_url']
+            if document.preview:
+                document.preview_url = storage.delivery_urls(document.preview)['delivery_url']
+            batch.append(document)
+            if len(batch) >= options['batch_size']:
+                count += Document.objects.bulk_update(batch, FIELDS)
+                batch = []
+        if batch:
+            count += Document.objects.bulk_update(batch, FIELDS)
+
+        if count:
+            # Los listados cacheados tienen las URLs anteriores
+            UserStats.objects.update(library_version=F('library_version') + 1)
+
+        self.stdout.write(self.style.SUCCESS(f'{count} documentos actualizados'))
@@ -0,0 +1,59 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main import jobs
+from main.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta los trabajos pendientes de la cola (borrados en el almacenamiento, etc.)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=settings.JOBS_WORKER_CONCURRENCY,
+            help='Trabajos ejecutados a la vez',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Vacía la cola y termina (para ejecutarlo desde cron)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=settings.JOBS_POLL_SECONDS,
+            help='Segundos de espera cuando la cola está vacía',
+        )
+        parser.add_argument(
+            '--kind',
+            action='append',
+            choices=sorted(jobs.HANDLERS),
+            help='Ejecuta solo los trabajos de este tipo (se puede repetir)',
+        )
+        parser.add_argument(
+            '--retry-dead',
+            action='store_true',
+            help='Vuelve a encolar los trabajos fallidos antes de empezar',
+        )
+
+    def handle(self, *args, **options):
+        if options['retry_dead']:
+            count = Job.objects.filter(status=Job.DEAD).update(status=Job.PENDING, attempts=0)
+            self.stdout.write(f'{count} trabajos fallidos reencolados')
+
+        concurrency = max(1, options['concurrency'])
+        while True:
+            done, failed = jobs.run_pending(concurrency=concurrency, kinds=options['kind'])
+            if done or failed:
+                self.stdout.write(f'{done} trabajos terminados, {failed} fallidos')
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+
+        dead = Job.objects.filter(status=Job.DEAD).count()
+        if dead:
+            self.stdout.write(self.style.WARNING(f'{dead} trabajos fallidos (ver last_error)'))
@@ -0,0 +1,203 @@
+"""
+Métricas del proceso en memoria, expuestas en formato de texto de
+Prometheus en /metrics:
+
+- lideresas_http_request_duration_seconds{view, method, status}
+- lideresas_db_queries_total{view} y lideresas_db_query_duration_seconds_total{view}
+- lideresas_storage_call_duration_seconds{backend, operation}
+- lideresas_storage_errors_total{backend, operation}
+
+Cada proceso (worker de gunicorn/uvicorn) lleva sus propias cuentas;
+Prometheus las distingue por instancia al recolectarlas.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.extend(self._render_value(labels, value))
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_value(self, labels, value):
+        yield f'{self.name}{_format_labels(labels)} {value}'
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = buckets
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def _render_value(self, labels, value):
+        counts, total, count = value
+        for bound, bucket_count in zip(self.buckets, counts):
+            yield f'{self.name}_bucket{_format_labels(labels + (("le", bound),))} {bucket_count}'
+        yield f'{self.name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {count}'
+        yield f'{self.name}_sum{_format_labels(labels)} {total}'
+        yield f'{self.name}_count{_format_labels(labels)} {count}'
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        for metric in self.metrics:
+            with metric._lock:
+                metric._values.clear()
+
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    'lideresas_http_request_duration_seconds', 'Tiempo de respuesta por vista',
+))
+DB_QUERIES = REGISTRY.register(Counter(
+    'lideresas_db_queries_total', 'Consultas SQL ejecutadas por vista',
+))
+DB_QUERY_TIME = REGISTRY.register(Counter(
+    'lideresas_db_query_duration_seconds_total', 'Tiempo total en consultas SQL por vista',
+))
+STORAGE_DURATION = REGISTRY.register(Histogram(
+    'lideresas_storage_call_duration_seconds', 'Duración de las llamadas al almacenamiento',
+))
+STORAGE_ERRORS = REGISTRY.register(Counter(
+    'lideresas_storage_errors_total', 'Llamadas al almacenamiento que fallaron',
+))
+
+
+class QueryStats:
+    __slots__ = ('count', 'duration')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+# Consultas de la petición en curso. Es un objeto mutable para que
+# sync_to_async (que copia el contexto al hilo del ORM) sume en el mismo.
+current_queries = ContextVar('current_queries', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_queries.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.duration += time.perf_counter() - start
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Receptor de connection_created: mide las consultas de cada conexión"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+# Llamadas que salen del proceso hacia el almacenamiento
+STORAGE_OPERATIONS = ('upload', 'aupload', 'destroy', 'destroy_many', 'open', 'open_stream', 'stored_size')
+
+
+class InstrumentedStorage:
+    """Envuelve un StorageBackend y mide la latencia y los errores de sus llamadas"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.label = type(backend).__name__
+
+    def __getattr__(self, name):
+        attr = getattr(self.backend, name)
+        if name not in STORAGE_OPERATIONS:
+            return attr
+        labels = {'backend': self.label, 'operation': name}
+
+        def record(start, failed):
+            STORAGE_DURATION.observe(time.perf_counter() - start, **labels)
+            if failed:
+                STORAGE_ERRORS.inc(**labels)
+
+        if iscoroutinefunction(attr):
+            @wraps(attr)
+            async def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    result = await attr(*args, **kwargs)
+                except Exception:
+                    record(start, True)
+                    raise
+                record(start, False)
+                return result
+        else:
+            @wraps(attr)
+            def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    result = attr(*args, **kwargs)
+                except Exception:
+                    record(start, True)
+                    raise
+                # destroy_many informa los fallos parciales en lugar de lanzar
+                record(start, name == 'destroy_many' and bool(result))
+                return result
+        return timed
@@ -0,0 +1,62 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import DB_QUERIES, DB_QUERY_TIME, REQUEST_DURATION, QueryStats, current_queries
+
+
+class MetricsMiddleware:
+    """
+    Registra la latencia de cada vista y las consultas SQL que hizo (ver
+    main/metrics.py). Funciona igual bajo WSGI y ASGI; en las respuestas en
+    streaming se mide hasta que la vista entrega la respuesta.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, start = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_queries.reset(token)
+        self.finish(request, response, stats, start)
+        return response
+
+    async def __acall__(self, request):
+        stats, token, start = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_queries.reset(token)
+        self.finish(request, response, stats, start)
+        return response
+
+    @staticmethod
+    def start():
+        stats = QueryStats()
+        return stats, current_queries.set(stats), time.perf_counter()
+
+    @staticmethod
+    def finish(request, response, stats, start):
+        match = request.resolver_match
+        view = match.view_name if match else 'sin_ruta'
+        REQUEST_DURATION.observe(
+            time.perf_counter() - start,
+            view=view,
+            method=request.method,
+            status=response.status_code,
+        )
+        DB_QUERIES.inc(stats.count, view=view)
+        DB_QUERY_TIME.inc(stats.duration, view=view)
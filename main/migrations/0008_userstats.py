@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:05
+
+from datetime import datetime, time, timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+
+def populate_user_stats(apps, schema_editor):
+    Document = apps.get_model('main', 'Document')
+    UserStats = apps.get_model('main', 'UserStats')
+    # El contador de hoy también sale de uploaded_at, si no vale 0 hasta la próxima subida
+    today = timezone.localdate()
+    start = timezone.make_aware(datetime.combine(today, time.min))
+    end = start + timedelta(days=1)
+    rows = Document.objects.order_by().values('user').annotate(
+        count=Count('id'),
+        size=Sum('size'),
+        today_count=Count('id', filter=Q(uploaded_at__gte=start, uploaded_at__lt=end)),
+    )
+    UserStats.objects.bulk_create([
+        UserStats(
+            user_id=row['user'],
+            document_count=row['count'],
+            total_size=row['size'] or 0,
+            day=today,
+            documents_on_day=row['today_count'],
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_alter_document_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('document_count', models.IntegerField(default=0)),
+                ('total_size', models.BigIntegerField(default=0)),
+                ('day', models.DateField(blank=True, null=True)),
+                ('documents_on_day', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'User stats',
+                'db_table': 'user_stats',
+            },
+        ),
+        migrations.RunPython(populate_user_stats, migrations.RunPython.noop),
+    ]
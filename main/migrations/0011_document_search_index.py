@@ -0,0 +1,83 @@
+from django.db import migrations
+
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE documents ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(tags, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(notes, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX documents_search_vector_idx ON documents USING GIN (search_vector)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS documents_search_vector_idx",
+    "ALTER TABLE documents DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE documents_fts USING fts5(
+        name, tags, notes,
+        content='documents', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS documents_fts_insert AFTER INSERT ON documents BEGIN
+        INSERT INTO documents_fts(rowid, name, tags, notes)
+        VALUES (new.id, new.name, new.tags, new.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS documents_fts_delete AFTER DELETE ON documents BEGIN
+        INSERT INTO documents_fts(documents_fts, rowid, name, tags, notes)
+        VALUES ('delete', old.id, old.name, old.tags, old.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS documents_fts_update AFTER UPDATE OF name, tags, notes ON documents BEGIN
+        INSERT INTO documents_fts(documents_fts, rowid, name, tags, notes)
+        VALUES ('delete', old.id, old.name, old.tags, old.notes);
+        INSERT INTO documents_fts(rowid, name, tags, notes)
+        VALUES (new.id, new.name, new.tags, new.notes);
+    END
+    """,
+    "INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS documents_fts_update",
+    "DROP TRIGGER IF EXISTS documents_fts_delete",
+    "DROP TRIGGER IF EXISTS documents_fts_insert",
+    "DROP TABLE IF EXISTS documents_fts",
+]
+
+STATEMENTS = {
+    'postgresql': (POSTGRES_FORWARD, POSTGRES_BACKWARD),
+    'sqlite': (SQLITE_FORWARD, SQLITE_BACKWARD),
+}
+
+
+def run_statements(direction):
+    def run(apps, schema_editor):
+        statements = STATEMENTS.get(schema_editor.connection.vendor)
+        if statements is None:
+            return
+        for sql in statements[direction]:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_blob'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_statements(0), run_statements(1)),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def split_existing_tags(apps, schema_editor):
+    Document = apps.get_model('main', 'Document')
+    Tag = apps.get_model('main', 'Tag')
+    DocumentTag = apps.get_model('main', 'DocumentTag')
+
+    tag_ids = {}
+    links = []
+    documents = Document.objects.exclude(tags='').only('id', 'user_id', 'tags')
+    for doc in documents.iterator():
+        names = []
+        for raw in doc.tags.split(','):
+            name = ' '.join(raw.split()).lower()[:50]
+            if name and name not in names:
+                names.append(name)
+        for name in names:
+            key = (doc.user_id, name)
+            if key not in tag_ids:
+                tag_ids[key] = Tag.objects.create(user_id=doc.user_id, name=name).id
+            links.append(DocumentTag(document_id=doc.id, tag_id=tag_ids[key]))
+    DocumentTag.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_document_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tags', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'tags',
+                'unique_together': {('user', 'name')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DocumentTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_tags', to='main.document')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_tags', to='main.tag')),
+            ],
+            options={
+                'db_table': 'document_tags',
+            },
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='tag_objects',
+            field=models.ManyToManyField(blank=True, related_name='documents', through='main.DocumentTag', to='main.tag'),
+        ),
+        migrations.AddIndex(
+            model_name='documenttag',
+            index=models.Index(fields=['tag', 'document'], name='document_tags_tag_doc_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='documenttag',
+            unique_together={('document', 'tag')},
+        ),
+        migrations.RunPython(split_existing_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0012_tag'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='delivery_url',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='download_url',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_document_delivery_urls'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='library_version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:38
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(models.F('user'), django.db.models.functions.text.Lower('name'), name='categories_user_name_ci_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['user', '-uploaded_at', '-id'], name='documents_user_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['user', 'category'], name='documents_user_category_idx'),
+        ),
+    ]
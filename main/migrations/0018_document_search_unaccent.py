@@ -0,0 +1,60 @@
+from django.db import migrations
+
+
+# unaccent() no es IMMUTABLE y no se puede usar en una columna generada; una
+# configuración de texto que lo incluye sí (to_tsvector(regconfig, text) lo es).
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE TEXT SEARCH CONFIGURATION documents_search (COPY = simple)",
+    """
+    ALTER TEXT SEARCH CONFIGURATION documents_search
+    ALTER MAPPING FOR asciiword, asciihword, hword_asciipart, word, hword, hword_part WITH unaccent, simple
+    """,
+    "DROP INDEX IF EXISTS documents_search_vector_idx",
+    "ALTER TABLE documents DROP COLUMN IF EXISTS search_vector",
+    """
+    ALTER TABLE documents ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('documents_search', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('documents_search', coalesce(tags, '')), 'B') ||
+        setweight(to_tsvector('documents_search', coalesce(notes, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX documents_search_vector_idx ON documents USING GIN (search_vector)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS documents_search_vector_idx",
+    "ALTER TABLE documents DROP COLUMN IF EXISTS search_vector",
+    """
+    ALTER TABLE documents ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(tags, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(notes, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX documents_search_vector_idx ON documents USING GIN (search_vector)",
+    "DROP TEXT SEARCH CONFIGURATION IF EXISTS documents_search",
+]
+
+
+def run_statements(statements):
+    def run(apps, schema_editor):
+        # SQLite ya ignora los acentos (tokenize='unicode61 remove_diacritics 2')
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0017_document_preview'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_statements(POSTGRES_FORWARD), run_statements(POSTGRES_BACKWARD)),
+    ]
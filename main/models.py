@@ -1,7 +1,53 @@
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
-from django.db import models
+import hashlib
+import os
+import uuid
+from datetime import datetime, time, timedelta
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, Lower
+from django.utils import timezone
+from django.conf import settings
 from cloudinary.models import CloudinaryField
 
+def format_size(size):
+    """Formatea una cantidad de bytes en B/KB/MB/GB"""
+    if size < 1024:
+        return f"{size} B"
+    elif size < 1024 * 1024:
+        return f"{size / 1024:.0f} KB"
+    elif size < 1024 * 1024 * 1024:
+        return f"{size / (1024 * 1024):.2f} MB"
+    else:
+        return f"{size / (1024 * 1024 * 1024):.2f} GB"
+
+
+def sha256_file(fileobj, chunk_size=1024 * 1024):
+    """SHA-256 en hexadecimal leyendo el archivo por bloques; lo deja en la posición 0"""
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(chunk_size), b''):
+        digest.update(block)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def parse_tags(text):
+    """Separa el texto de etiquetas por comas: minúsculas, sin espacios extra ni repetidas"""
+    names = []
+    for raw in (text or '').split(','):
+        name = ' '.join(raw.split()).lower()[:Tag.MAX_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def day_range(day):
+    """Rango [inicio, fin) en la zona horaria actual para filtrar un día sin usar __date"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -37,24 +83,117 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         return self.email
 
 
+class CategoryQuerySet(models.QuerySet):
+    def with_document_count(self):
+        """Anota el número de documentos de cada categoría en la misma consulta"""
+        return self.annotate(documents_total=Count('documents'))
+
+    def named(self, name):
+        """
+        Filtra por nombre sin distinguir mayúsculas. A diferencia de
+        name__iexact (LIKE en SQLite, UPPER() en Postgres), compara
+        LOWER(name) = LOWER(%s), que usa categories_user_name_ci_idx.
+        """
+        return self.alias(name_lower=Lower('name')).filter(name_lower=Lower(Value(name)))
+
+
 class Category(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='categories')
     name = models.CharField(max_length=100)
     icon = models.CharField(max_length=10, default='📁')
     created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = CategoryQuerySet.as_manager()
     
     class Meta:
         db_table = 'categories'
         verbose_name_plural = 'Categories'
         unique_together = ['user', 'name']
+        indexes = [
+            models.Index(F('user'), Lower('name'), name='categories_user_name_ci_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.name}"
     
     def document_count(self):
+        # Usar el valor anotado por with_document_count() si está disponible
+        if hasattr(self, 'documents_total'):
+            return self.documents_total
         return self.documents.count()
 
 
+class Blob(models.Model):
+    """
+    Contenido almacenado una sola vez por usuario, identificado por su SHA-256.
+
+    Cada Document que apunta al blob suma una referencia; el objeto remoto
+    solo se elimina cuando se libera la última.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='blobs')
+    checksum = models.CharField(max_length=64)
+    public_id = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'blobs'
+        unique_together = ['user', 'checksum']
+
+    def __str__(self):
+        return f"{self.user_id} - {self.checksum[:12]} ({self.ref_count})"
+
+    @classmethod
+    def acquire(cls, user, checksum, count=1):
+        """Suma `count` referencias al blob con ese contenido. Retorna None si no existe."""
+        updated = cls.objects.filter(user=user, checksum=checksum).update(ref_count=F('ref_count') + count)
+        if not updated:
+            return None
+        return cls.objects.get(user=user, checksum=checksum)
+
+    @classmethod
+    def register(cls, user, checksum, public_id, size, count=1):
+        """
+        Crea el blob de un archivo recién subido con `count` referencias.
+
+        Si otra petición registró el mismo contenido primero, suma las
+        referencias a ese blob y retorna created=False: el archivo recién
+        subido sobra y el llamador debe eliminarlo.
+        """
+        try:
+            with transaction.atomic():
+                blob = cls.objects.create(
+                    user=user,
+                    checksum=checksum,
+                    public_id=public_id,
+                    size=size,
+                    ref_count=count
+                )
+            return blob, True
+        except IntegrityError:
+            return cls.acquire(user, checksum, count), False
+
+    @classmethod
+    def release_many(cls, counts):
+        """
+        Resta referencias y borra los blobs que llegan a cero: `counts` es
+        {blob_id: referencias a restar}. Retorna los public_id que quedaron
+        sin documentos y hay que eliminar del almacenamiento.
+        """
+        # Un UPDATE por cada cantidad distinta (casi siempre solo 1)
+        by_count = {}
+        for blob_id, count in counts.items():
+            by_count.setdefault(count, []).append(blob_id)
+        for count, blob_ids in by_count.items():
+            cls.objects.filter(pk__in=blob_ids).update(ref_count=F('ref_count') - count)
+
+        orphans = cls.objects.filter(pk__in=list(counts), ref_count__lte=0)
+        public_ids = list(orphans.values_list('public_id', flat=True))
+        orphans.delete()
+        return public_ids
+
+
 class Document(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='documents')
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='documents')
@@ -65,10 +204,26 @@ class Document(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
     notes = models.TextField(blank=True)
     tags = models.CharField(max_length=255, blank=True)
+    checksum = models.CharField(max_length=64, blank=True, db_index=True)
+    blob = models.ForeignKey(Blob, on_delete=models.RESTRICT, null=True, blank=True, related_name='documents')
+    # URLs canónicas calculadas al subir (Storage.delivery_urls); los listados no las recalculan
+    delivery_url = models.CharField(max_length=500, blank=True)
+    download_url = models.CharField(max_length=500, blank=True)
+    # Miniatura WebP (public_id y URL), generada por el trabajo 'preview' (main/jobs.py)
+    preview = models.CharField(max_length=255, blank=True)
+    preview_url = models.CharField(max_length=500, blank=True)
+    # Versión normalizada de `tags`, indexada para filtrar y contar por etiqueta
+    tag_objects = models.ManyToManyField('Tag', through='DocumentTag', related_name='documents', blank=True)
     
     class Meta:
         db_table = 'documents'
         ordering = ['-uploaded_at']
+        indexes = [
+            # Los listados filtran por usuario y ordenan por (-uploaded_at, -id)
+            # (ver pagination.keyset_page): el índice entrega las filas ya ordenadas
+            models.Index(fields=['user', '-uploaded_at', '-id'], name='documents_user_uploaded_idx'),
+            models.Index(fields=['user', 'category'], name='documents_user_category_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.name}"
@@ -78,14 +233,7 @@ class Document(models.Model):
         if not self.size:
             return "Desconocido"
         
-        if self.size < 1024:
-            return f"{self.size} B"
-        elif self.size < 1024 * 1024:
-            return f"{self.size / 1024:.0f} KB"
-        elif self.size < 1024 * 1024 * 1024:
-            return f"{self.size / (1024 * 1024):.2f} MB"
-        else:
-            return f"{self.size / (1024 * 1024 * 1024):.2f} GB"
+        return format_size(self.size)
     
     def get_icon(self):
         """Retorna el emoji según la extensión del archivo"""
@@ -116,4 +264,273 @@ class Document(models.Model):
             'java': '☕',
             'c': '🔧', 'cpp': '🔧',
         }
-        return icons.get(ext, '📎')
\ No newline at end of file
+        return icons.get(ext, '📎')
+
+
+class Tag(models.Model):
+    MAX_LENGTH = 50
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='tags')
+    name = models.CharField(max_length=MAX_LENGTH)
+
+    class Meta:
+        db_table = 'tags'
+        unique_together = ['user', 'name']
+
+    def __str__(self):
+        return f"{self.user_id} - {self.name}"
+
+    @classmethod
+    def attach(cls, user, documents, text):
+        """
+        Enlaza los documentos con las etiquetas de `text`, creando las que
+        falten. Usa un número fijo de consultas sin importar cuántos
+        documentos o etiquetas haya.
+        """
+        names = parse_tags(text)
+        if not names or not documents:
+            return []
+
+        cls.objects.bulk_create(
+            [cls(user=user, name=name) for name in names],
+            ignore_conflicts=True
+        )
+        tags = list(cls.objects.filter(user=user, name__in=names))
+        DocumentTag.objects.bulk_create(
+            [DocumentTag(document=doc, tag=tag) for doc in documents for tag in tags],
+            ignore_conflicts=True
+        )
+        return tags
+
+
+class DocumentTag(models.Model):
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='document_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='document_tags')
+
+    class Meta:
+        db_table = 'document_tags'
+        unique_together = ['document', 'tag']
+        indexes = [
+            # Filtrar por etiqueta recorre (tag, document) sin tocar la tabla documents
+            models.Index(fields=['tag', 'document'], name='document_tags_tag_doc_idx'),
+        ]
+
+
+class UserStats(models.Model):
+    """
+    Estadísticas del dashboard materializadas por usuario.
+
+    Se actualizan con expresiones F() en las rutas de subida y eliminación,
+    así el dashboard las lee con una sola búsqueda por clave primaria. El
+    contador diario se reinicia solo: `documents_on_day` vale para `day`.
+
+    `library_version` sube con cada cambio en la biblioteca (documentos o
+    categorías) y versiona las respuestas cacheadas de los listados.
+    """
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    document_count = models.IntegerField(default=0)
+    total_size = models.BigIntegerField(default=0)
+    day = models.DateField(null=True, blank=True)
+    documents_on_day = models.IntegerField(default=0)
+    library_version = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'user_stats'
+        verbose_name_plural = 'User stats'
+
+    def __str__(self):
+        return f"{self.user_id} - {self.document_count} documentos"
+
+    @property
+    def documents_today(self):
+        return self.documents_on_day if self.day == timezone.localdate() else 0
+
+    def get_size_display(self):
+        return format_size(self.total_size)
+
+    @classmethod
+    def for_user(cls, user):
+        """Lee las estadísticas del usuario (ceros si aún no tiene fila)"""
+        return cls.objects.filter(pk=user.pk).first() or cls(user=user)
+
+    @classmethod
+    def library_version_for(cls, user):
+        return cls.objects.filter(pk=user.pk).values_list('library_version', flat=True).first() or 0
+
+    @classmethod
+    def bump_version(cls, user):
+        """Invalida los listados cacheados del usuario (p. ej. al cambiar sus categorías)"""
+        cls.objects.get_or_create(user=user)
+        cls.objects.filter(pk=user.pk).update(library_version=F('library_version') + 1)
+
+    @classmethod
+    def record_upload(cls, user, documents):
+        """Suma los documentos recién creados. Llamar dentro de la transacción del INSERT."""
+        today = timezone.localdate()
+        count = len(documents)
+        size = sum(doc.size or 0 for doc in documents)
+
+        cls.objects.get_or_create(user=user)
+        cls.objects.filter(pk=user.pk).update(
+            document_count=F('document_count') + count,
+            total_size=F('total_size') + size,
+            documents_on_day=Case(
+                When(day=today, then=F('documents_on_day') + count),
+                default=Value(count),
+            ),
+            day=today,
+            library_version=F('library_version') + 1,
+        )
+
+    @classmethod
+    def record_delete(cls, user, documents):
+        """Resta los documentos eliminados. Llamar dentro de la transacción del DELETE."""
+        today = timezone.localdate()
+        count = len(documents)
+        size = sum(doc.size or 0 for doc in documents)
+        today_count = sum(1 for doc in documents if timezone.localdate(doc.uploaded_at) == today)
+
+        cls.objects.filter(pk=user.pk).update(
+            document_count=Greatest(F('document_count') - count, 0),
+            total_size=Greatest(F('total_size') - size, 0),
+            documents_on_day=Case(
+                When(day=today, then=Greatest(F('documents_on_day') - today_count, 0)),
+                default=F('documents_on_day'),
+            ),
+            library_version=F('library_version') + 1,
+        )
+
+    @classmethod
+    def compute_all(cls):
+        """Recalcula desde cero las estadísticas de todos los usuarios con documentos"""
+        today = timezone.localdate()
+        start, end = day_range(today)
+        rows = (
+            Document.objects.order_by()
+            .values('user')
+            .annotate(
+                count=Count('id'),
+                size=Coalesce(Sum('size'), 0),
+                today_count=Count('id', filter=Q(uploaded_at__gte=start, uploaded_at__lt=end)),
+            )
+        )
+        return [
+            cls(
+                user_id=row['user'],
+                document_count=row['count'],
+                total_size=row['size'],
+                day=today,
+                documents_on_day=row['today_count'],
+            )
+            for row in rows
+        ]
+
+
+class UploadSession(models.Model):
+    """
+    Subida reanudable por partes, al estilo del protocolo tus.
+
+    Los bytes recibidos se van escribiendo en CHUNKED_UPLOAD_DIR y `offset`
+    marca el último byte confirmado; al completarse se sube el archivo al
+    almacenamiento y se enlaza el Document creado.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='upload_sessions')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    name = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    notes = models.TextField(blank=True)
+    tags = models.CharField(max_length=255, blank=True)
+    document = models.OneToOneField(Document, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'upload_sessions'
+
+    def __str__(self):
+        return f"{self.user_id} - {self.name} ({self.offset}/{self.size})"
+
+    @property
+    def is_complete(self):
+        return self.offset >= self.size
+
+    @property
+    def part_path(self):
+        return os.path.join(settings.CHUNKED_UPLOAD_DIR, f"{self.id}.part")
+
+    def received_bytes(self):
+        """
+        Bytes que hay realmente en la parte. Pueden no coincidir con `offset`
+        si el archivo se perdió (otra instancia, limpieza de /tmp) o si una
+        escritura no llegó a confirmarse.
+        """
+        try:
+            return os.path.getsize(self.part_path)
+        except FileNotFoundError:
+            return 0
+
+    def write_chunk(self, stream, length, buffer_size=64 * 1024):
+        """
+        Escribe hasta `length` bytes de `stream` a partir de `offset`.
+
+        Retorna los bytes escritos; si la parte llegó cortada se conserva lo
+        recibido para reanudar desde ahí. El llamador debe comprobar antes
+        received_bytes() == offset: si faltan bytes, seek() rellenaría el
+        hueco con ceros.
+        """
+        os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+        mode = 'r+b' if os.path.exists(self.part_path) else 'wb'
+        remaining = length
+        with open(self.part_path, mode) as part:
+            part.seek(self.offset)
+            part.truncate()
+            while remaining > 0:
+                data = stream.read(min(buffer_size, remaining))
+                if not data:
+                    break
+                part.write(data)
+                remaining -= len(data)
+        return length - remaining
+
+    def discard_data(self):
+        try:
+            os.remove(self.part_path)
+        except FileNotFoundError:
+            pass
+
+
+class Job(models.Model):
+    """
+    Trabajo de la cola en la base de datos (outbox), ver main/jobs.py.
+
+    `run_at` es cuándo puede ejecutarse: al reclamarlo un worker se mueve
+    al final del plazo de ejecución, así un trabajo de un worker caído
+    vuelve a estar disponible solo.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DEAD = 'dead'
+    STATUS_CHOICES = [
+        (PENDING, 'Pendiente'),
+        (RUNNING, 'En ejecución'),
+        (DEAD, 'Fallido'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'jobs'
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='jobs_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status}, {self.attempts} intentos)"
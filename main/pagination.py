@@ -0,0 +1,63 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(document):
+    """Codifica la posición (uploaded_at, id) de un documento en un cursor opaco"""
+    raw = f"{document.uploaded_at.isoformat()}|{document.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Devuelve la tupla (uploaded_at, id) guardada en el cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        uploaded_at, doc_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(uploaded_at), int(doc_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise PaginationError(f'Cursor inválido: {cursor}') from e
+
+
+def parse_page_size(value):
+    """Normaliza el parámetro ?limit= dentro de [1, MAX_PAGE_SIZE]"""
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(value)
+    except ValueError:
+        raise PaginationError(f'Límite inválido: {value}')
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def keyset_page(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Pagina por keyset sobre (-uploaded_at, -id).
+
+    Retorna (filas, siguiente_cursor). Se pide una fila de más para saber
+    si hay otra página sin necesidad de un COUNT(*).
+    """
+    queryset = queryset.order_by('-uploaded_at', '-id')
+    if cursor:
+        uploaded_at, doc_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(uploaded_at__lt=uploaded_at) |
+            Q(uploaded_at=uploaded_at, id__lt=doc_id)
+        )
+
+    rows = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1])
+    return rows, next_cursor
@@ -0,0 +1,119 @@
+"""
+Miniaturas WebP para la grilla de documentos.
+
+Las imágenes se reducen con Pillow; de los PDF se dibuja la primera
+página con pypdfium2. El trabajo 'preview' (main/jobs.py) descarga el
+original, llama a render() y sube la miniatura al mismo almacenamiento,
+con un nombre derivado de la huella SHA-256: los documentos con el mismo
+contenido comparten una sola miniatura.
+"""
+import importlib.util
+import io
+import os
+import re
+from functools import lru_cache
+
+from django.conf import settings
+
+
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp', 'tif', 'tiff'}
+PDF_EXTENSIONS = {'pdf'}
+
+
+# Pillow y pypdfium2 tardan decenas de ms en importarse y solo los usan los
+# trabajos (el worker de run_jobs o el cron de /api/jobs/run/): se importan
+# al generar la primera miniatura.
+
+@lru_cache(maxsize=None)
+def installed(module):
+    return importlib.util.find_spec(module) is not None
+
+
+@lru_cache(maxsize=None)
+def load_pillow():
+    """PIL.Image, o None si Pillow no está instalado (los listados muestran el ícono)"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+@lru_cache(maxsize=None)
+def load_pdfium():
+    """pypdfium2, o None si no está instalado (los PDF se quedan sin vista previa)"""
+    try:
+        import pypdfium2
+    except ImportError:
+        return None
+    return pypdfium2
+
+
+def render_errors():
+    """Errores de archivos dañados o que no son lo que dice su extensión"""
+    errors = (OSError, ValueError)
+    if load_pillow() is not None:
+        errors += (load_pillow().DecompressionBombError,)
+    if load_pdfium() is not None:
+        errors += (load_pdfium().PdfiumError,)
+    return errors
+
+
+class PreviewError(Exception):
+    """El archivo no se puede leer como imagen o PDF: reintentar no sirve"""
+
+
+def extension(name):
+    return os.path.splitext(name)[1].lstrip('.').lower()
+
+
+def can_preview(name, size=None):
+    if size and size > settings.PREVIEW_MAX_SOURCE_SIZE:
+        return False
+    ext = extension(name)
+    if not installed('PIL'):
+        return False
+    return ext in IMAGE_EXTENSIONS or (ext in PDF_EXTENSIONS and installed('pypdfium2'))
+
+
+def preview_name(user_id, public_id, checksum=''):
+    """Nombre de la miniatura en el almacenamiento, junto a los originales"""
+    key = checksum or re.sub(r'[^a-zA-Z0-9_-]', '_', public_id)
+    return f'previews/{user_id}_{key}.webp'
+
+
+def _open_image(source, size):
+    from PIL import ImageOps
+
+    image = load_pillow().open(source)
+    # En JPEG decodifica directamente a una escala cercana: mucho menos trabajo
+    image.draft('RGB', (size, size))
+    return ImageOps.exif_transpose(image)
+
+
+def _render_pdf_page(source, size):
+    pdf = load_pdfium().PdfDocument(source.read())
+    try:
+        page = pdf[0]
+        scale = size / max(page.get_size())
+        return page.render(scale=scale).to_pil()
+    finally:
+        pdf.close()
+
+
+def render(source, name, size=None):
+    """Retorna la miniatura en WebP (bytes) del archivo abierto `source`"""
+    size = size or settings.PREVIEW_SIZE
+    try:
+        if extension(name) in PDF_EXTENSIONS:
+            image = _render_pdf_page(source, size)
+        else:
+            image = _open_image(source, size)
+        image.thumbnail((size, size))
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        output = io.BytesIO()
+        image.save(output, 'WEBP', quality=settings.PREVIEW_QUALITY, method=4)
+    except render_errors() as e:
+        raise PreviewError(f'No se pudo generar la vista previa de {name}: {e}') from e
+    return output.getvalue()
@@ -0,0 +1,66 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+
+class StreamingJsonResponse(StreamingHttpResponse):
+    """
+    Respuesta JSON con la forma {"success": true, "<key>": [...]} que se
+    escribe fila por fila, sin construir la lista completa en memoria.
+
+    `rows` puede ser cualquier iterable (por ejemplo un queryset con
+    .iterator()) o un iterable async (.aiterator() en vistas async) y
+    `serialize` convierte cada elemento en un dict.
+    """
+
+    def __init__(self, rows, serialize, key='documents', extra=None, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        encode = self._aencode if hasattr(rows, '__aiter__') else self._encode
+        super().__init__(encode(rows, serialize, key, extra or {}), **kwargs)
+
+    @staticmethod
+    def _head(key, extra):
+        return DjangoJSONEncoder().encode({'success': True, **extra})[:-1] + f', {json.dumps(key)}: ['
+
+    @classmethod
+    def _encode(cls, rows, serialize, key, extra):
+        encoder = DjangoJSONEncoder()
+        yield cls._head(key, extra)
+        first = True
+        for row in rows:
+            chunk = encoder.encode(serialize(row))
+            yield chunk if first else ', ' + chunk
+            first = False
+        yield ']}'
+
+    @classmethod
+    async def _aencode(cls, rows, serialize, key, extra):
+        encoder = DjangoJSONEncoder()
+        yield cls._head(key, extra)
+        first = True
+        async for row in rows:
+            chunk = encoder.encode(serialize(row))
+            yield chunk if first else ', ' + chunk
+            first = False
+        yield ']}'
+
+
+def stream_without_blocking(response):
+    """
+    Bajo ASGI, Django consume los iteradores sync de StreamingHttpResponse
+    cargándolos enteros en memoria. Esto los convierte en un iterador async
+    que lee cada bloque en un hilo (p. ej. un FileResponse de varios MB).
+    """
+    if not response.streaming or response.is_async:
+        return response
+    chunks = iter(response.streaming_content)
+
+    async def read_chunks():
+        next_chunk = sync_to_async(next, thread_sensitive=False)
+        while (chunk := await next_chunk(chunks, None)) is not None:
+            yield chunk
+
+    response.streaming_content = read_chunks()
+    return response
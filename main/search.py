@@ -0,0 +1,119 @@
+"""
+Búsqueda de texto completo sobre nombre, etiquetas y notas de los documentos.
+
+El índice lo mantiene la propia base de datos (ver migración 0011):
+
+- PostgreSQL: columna generada `documents.search_vector` (tsvector) con
+  índice GIN, con la configuración `documents_search` (simple + unaccent,
+  migración 0018) para ignorar los acentos igual que SQLite.
+- SQLite: tabla FTS5 `documents_fts` sincronizada con triggers de
+  INSERT/UPDATE/DELETE sobre `documents`.
+
+Así cualquier ruta que cree o borre documentos (incluido bulk_create)
+mantiene el índice al día. Otros motores usan un filtro icontains.
+"""
+import re
+
+from django.db import connection, connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Document
+
+
+# Triggers que mantienen documents_fts al día. SQLite los pierde cuando una
+# migración reconstruye la tabla documents, por eso se vuelven a crear en
+# cada post_migrate (ver MainConfig.ready).
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS documents_fts_insert AFTER INSERT ON documents BEGIN
+        INSERT INTO documents_fts(rowid, name, tags, notes)
+        VALUES (new.id, new.name, new.tags, new.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS documents_fts_delete AFTER DELETE ON documents BEGIN
+        INSERT INTO documents_fts(documents_fts, rowid, name, tags, notes)
+        VALUES ('delete', old.id, old.name, old.tags, old.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS documents_fts_update AFTER UPDATE OF name, tags, notes ON documents BEGIN
+        INSERT INTO documents_fts(documents_fts, rowid, name, tags, notes)
+        VALUES ('delete', old.id, old.name, old.tags, old.notes);
+        INSERT INTO documents_fts(rowid, name, tags, notes)
+        VALUES (new.id, new.name, new.tags, new.notes);
+    END
+    """,
+]
+
+# Pesos de cada campo: el nombre pesa más que las etiquetas y estas más que las notas
+FTS5_WEIGHTS = (10.0, 5.0, 1.0)
+
+# Configuración de texto de Postgres: 'simple' sin acentos (ver migración 0018)
+POSTGRES_CONFIG = 'documents_search'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    """Palabras de la búsqueda, sin operadores ni comillas que rompan la sintaxis del motor"""
+    return TOKEN_RE.findall(query.lower())[:10]
+
+
+def ensure_sqlite_triggers(using='default', **kwargs):
+    """Receptor de post_migrate: restaura los triggers de documents_fts si faltan"""
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        if 'documents_fts' not in conn.introspection.table_names(cursor):
+            return
+        missing = not cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'documents_fts_insert'"
+        ).fetchone()
+        for sql in SQLITE_TRIGGERS:
+            cursor.execute(sql)
+        # Si faltaban, pudo haber escrituras sin indexar: reconstruir el índice
+        if missing:
+            cursor.execute("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')")
+
+
+def search_documents(user, query):
+    """
+    Queryset de documentos del usuario que coinciden con todas las palabras
+    de `query` (como prefijo), anotado con `rank` y ordenado por relevancia.
+    """
+    tokens = tokenize(query)
+    documents = Document.objects.filter(user=user)
+    if not tokens:
+        return documents.none()
+
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        query_sql = f"to_tsquery('{POSTGRES_CONFIG}', %s)"
+        return documents.filter(
+            RawSQL(f'documents.search_vector @@ {query_sql}', [tsquery], output_field=BooleanField()),
+        ).annotate(
+            rank=RawSQL(f'ts_rank_cd(documents.search_vector, {query_sql})', [tsquery], output_field=FloatField()),
+        ).order_by('-rank', '-uploaded_at')
+
+    if connection.vendor == 'sqlite':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        # bm25() devuelve valores más bajos para los mejores resultados
+        weights = ', '.join(str(weight) for weight in FTS5_WEIGHTS)
+        return documents.filter(
+            id__in=RawSQL('SELECT rowid FROM documents_fts WHERE documents_fts MATCH %s', [match]),
+        ).annotate(
+            rank=RawSQL(
+                f'SELECT -bm25(documents_fts, {weights}) FROM documents_fts '
+                'WHERE documents_fts MATCH %s AND documents_fts.rowid = documents.id',
+                [match],
+                output_field=FloatField(),
+            ),
+        ).order_by('-rank', '-uploaded_at')
+
+    condition = Q()
+    for token in tokens:
+        condition &= Q(name__icontains=token) | Q(tags__icontains=token) | Q(notes__icontains=token)
+    return documents.filter(condition).order_by('-uploaded_at')
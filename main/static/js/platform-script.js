@@ -47,121 +47,172 @@ function getFileIcon(filename) {
     return icons[ext] || '📎';
 }
 
+// Miniatura del documento si el servidor ya la generó; si no (o si falla), el ícono
+function documentThumbnail(doc) {
+    if (!doc.preview_url) {
+        return `<div class="document-icon">${doc.icon}</div>`;
+    }
+    return `
+        <div class="document-icon document-thumbnail" data-icon="${doc.icon}">
+            <img src="${doc.preview_url}" alt="" loading="lazy" decoding="async"
+                 onerror="this.parentNode.classList.remove('document-thumbnail'); this.parentNode.textContent = this.parentNode.dataset.icon;">
+        </div>`;
+}
+
 // ============================================
 // FUNCIONES PARA DOCUMENTOS
 // ============================================
 
-async function loadRecentDocuments() {
+function recentDocumentCard(doc) {
+    return `
+        <div class="document-card" data-category="${doc.category_slug || 'otros'}">
+            ${documentThumbnail(doc)}
+            <div class="document-name">${doc.name}</div>
+            <div class="document-info">
+                <span>${doc.size}</span>
+                <span>${doc.date}</span>
+            </div>
+            <div class="document-category">${doc.category}</div>
+        </div>
+    `;
+}
+
+function documentCard(doc) {
+    return `
+        <div class="document-card" data-category="${doc.category_slug || 'otros'}">
+            ${documentThumbnail(doc)}
+            <div class="document-name">${doc.name}</div>
+            <div class="document-info">
+                <span>${doc.size}</span>
+                <span>${doc.date}</span>
+            </div>
+            <div class="document-category">${doc.category}</div>
+            <div class="document-actions">
+                <button class="doc-action-btn doc-download" onclick="downloadDocument(${doc.id})">
+                    📥 Descargar
+                </button>
+                
+                <button class="doc-action-btn doc-delete" onclick="deleteDocument(${doc.id})">
+                    🗑️ Eliminar
+                </button>
+            </div>
+        </div>
+    `;
+}
+
+function renderRecentDocuments(recent) {
+    const recentContainer = document.getElementById('recentDocuments');
+    if (!recentContainer) return;
+    
+    if (recent.length === 0) {
+        recentContainer.innerHTML = '<p class="no-documents">No hay documentos recientes</p>';
+        return;
+    }
+    recentContainer.innerHTML = recent.map(recentDocumentCard).join('');
+}
+
+// Dibuja una página de la biblioteca; con append la agrega a las anteriores
+function renderAllDocuments(page, append = false) {
+    const allContainer = document.getElementById('allDocuments');
+    if (!allContainer) return;
+    
+    const loaded = page.map(doc => ({
+        id: doc.id,
+        name: doc.name,
+        category: doc.category_slug || 'otros',
+        date: doc.date,
+        size: doc.size,
+        icon: doc.icon,
+        preview_url: doc.preview_url
+    }));
+    documents = append ? documents.concat(loaded) : loaded;
+    
+    if (documents.length === 0) {
+        allContainer.innerHTML = '<p class="no-documents">No hay documentos subidos aún</p>';
+        return;
+    }
+    const html = page.map(documentCard).join('');
+    if (append) {
+        allContainer.insertAdjacentHTML('beforeend', html);
+    } else {
+        allContainer.innerHTML = html;
+    }
+}
+
+// La primera página viene en los datos iniciales; las siguientes se piden
+// por cursor solo cuando hacen falta (botón "Cargar más" o al llegar a él)
+const DOCUMENTS_PAGE_SIZE = 50;
+let nextDocumentsCursor = null;
+let loadingDocuments = false;
+
+function updateLoadMoreButton() {
+    const button = document.getElementById('loadMoreBtn');
+    if (!button) return;
+    button.style.display = nextDocumentsCursor ? '' : 'none';
+    button.disabled = loadingDocuments;
+    button.textContent = loadingDocuments ? 'Cargando...' : 'Cargar más documentos';
+}
+
+async function loadMoreDocuments() {
+    if (!nextDocumentsCursor || loadingDocuments) return;
+    loadingDocuments = true;
+    updateLoadMoreButton();
     try {
-        console.log('📂 Cargando documentos recientes...');
-        const response = await fetch('/api/documents/recent/');
-        
+        const response = await fetch(
+            `/api/documents/?limit=${DOCUMENTS_PAGE_SIZE}&cursor=${encodeURIComponent(nextDocumentsCursor)}`
+        );
         if (!response.ok) {
             throw new Error(`HTTP error ${response.status}`);
         }
-        
         const data = await response.json();
-        
-        if (data.success && data.documents) {
-            const recentContainer = document.getElementById('recentDocuments');
-            if (recentContainer) {
-                if (data.documents.length === 0) {
-                    recentContainer.innerHTML = '<p class="no-documents">No hay documentos recientes</p>';
-                    return;
-                }
-                
-                recentContainer.innerHTML = data.documents.map(doc => `
-                    <div class="document-card" data-category="${doc.category_slug || 'otros'}">
-                        <div class="document-icon">${doc.icon}</div>
-                        <div class="document-name">${doc.name}</div>
-                        <div class="document-info">
-                            <span>${doc.size}</span>
-                            <span>${doc.date}</span>
-                        </div>
-                        <div class="document-category">${doc.category}</div>
-                    </div>
-                `).join('');
-                
-                console.log(`✅ ${data.documents.length} documentos recientes cargados`);
-            }
+        if (!data.success) {
+            throw new Error(data.error || 'Error al cargar documentos');
         }
+        renderAllDocuments(data.documents, true);
+        nextDocumentsCursor = data.next_cursor;
     } catch (error) {
-        console.error('Error cargando documentos recientes:', error);
-        const recentContainer = document.getElementById('recentDocuments');
-        if (recentContainer) {
-            recentContainer.innerHTML = '<p class="no-documents">Error cargando documentos</p>';
-        }
+        console.error('Error cargando más documentos:', error);
+    } finally {
+        loadingDocuments = false;
+        updateLoadMoreButton();
     }
 }
 
-async function loadAllDocuments() {
+function updateDashboardStats(stats) {
+    Object.entries(stats).forEach(([key, value]) => {
+        const element = document.querySelector(`[data-stat="${key}"]`);
+        if (element) element.textContent = value;
+    });
+}
+
+// Dibuja el panel con los datos de /api/bootstrap/ (o los que trajo la página)
+function hydrateDashboard(data) {
+    updateDashboardStats(data.stats);
+    renderRecentDocuments(data.recent_documents);
+    renderAllDocuments(data.documents);
+    renderCategorySelect(data.categories);
+    nextDocumentsCursor = data.next_cursor;
+    updateLoadMoreButton();
+}
+
+// Vuelve a pedir los datos del panel en una sola petición
+async function refreshDashboard() {
     try {
-        console.log('📂 Cargando todos los documentos...');
-        const response = await fetch('/api/documents/');
-        
+        const response = await fetch('/api/bootstrap/');
         if (!response.ok) {
             throw new Error(`HTTP error ${response.status}`);
         }
-        
         const data = await response.json();
-        
-        if (data.success && data.documents) {
-            const allContainer = document.getElementById('allDocuments');
-            if (allContainer) {
-                if (data.documents.length === 0) {
-                    allContainer.innerHTML = '<p class="no-documents">No hay documentos subidos aún</p>';
-                    return;
-                }
-                
-                allContainer.innerHTML = data.documents.map(doc => `
-                    <div class="document-card" data-category="${doc.category_slug || 'otros'}">
-                        <div class="document-icon">${doc.icon}</div>
-                        <div class="document-name">${doc.name}</div>
-                        <div class="document-info">
-                            <span>${doc.size}</span>
-                            <span>${doc.date}</span>
-                        </div>
-                        <div class="document-category">${doc.category}</div>
-                        <div class="document-actions">
-                            <button class="doc-action-btn doc-download" onclick="downloadDocument(${doc.id})">
-                                📥 Descargar
-                            </button>
-                            
-                            <button class="doc-action-btn doc-delete" onclick="deleteDocument(${doc.id})">
-                                🗑️ Eliminar
-                            </button>
-                        </div>
-                    </div>
-                `).join('');
-                
-                // Actualizar la variable local documents
-                documents = data.documents.map(doc => ({
-                    id: doc.id,
-                    name: doc.name,
-                    category: doc.category_slug || 'otros',
-                    date: doc.date,
-                    size: doc.size,
-                    icon: doc.icon
-                }));
-                
-                console.log(`✅ ${data.documents.length} documentos cargados en total`);
-            }
-        }
-    } catch (error) {
-        console.error('Error cargando todos los documentos:', error);
-        const allContainer = document.getElementById('allDocuments');
-        if (allContainer) {
-            allContainer.innerHTML = '<p class="no-documents">Error cargando documentos</p>';
+        if (!data.success) {
+            throw new Error(data.error || 'Error al cargar el panel');
         }
-    }
-}
-
-async function updateDashboardStats() {
-    try {
-        console.log('Actualizando estadísticas...');
-        // Aquí podrías recargar la página si es necesario
+        hydrateDashboard(data);
     } catch (error) {
-        console.error('Error actualizando estadísticas:', error);
+        console.error('Error actualizando el panel:', error);
+        ['recentDocuments', 'allDocuments'].forEach(id => {
+            const container = document.getElementById(id);
+            if (container) container.innerHTML = '<p class="no-documents">Error cargando documentos</p>';
+        });
     }
 }
 
@@ -191,6 +242,19 @@ async function downloadDocument(id) {
     }
 }
 
+function downloadCategoryZip(categoryId) {
+    // El servidor arma el ZIP mientras lo envía: la descarga empieza enseguida
+    const iframe = document.createElement('iframe');
+    iframe.style.display = 'none';
+    iframe.src = `/api/documents/export/?category=${categoryId}`;
+    document.body.appendChild(iframe);
+
+    // El iframe no se quita antes: cortaría la descarga en curso
+    setTimeout(() => {
+        document.body.removeChild(iframe);
+    }, 60000);
+}
+
 async function deleteDocument(id) {
     if (confirm('¿Estás segura de eliminar este documento? Esta acción no se puede deshacer.')) {
         try {
@@ -281,6 +345,147 @@ function handleFiles(files) {
 // SUBIR DOCUMENTOS
 // ============================================
 
+async function postJson(url, payload) {
+    const response = await fetch(url, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': getCookie('csrftoken')
+        },
+        body: JSON.stringify(payload)
+    });
+    const data = await response.json();
+    if (!response.ok || !data.success) {
+        throw new Error(data.error || `Error ${response.status}`);
+    }
+    return data;
+}
+
+async function sha256Hex(file) {
+    if (!window.crypto || !window.crypto.subtle) return '';
+    const digest = await window.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+    return [...new Uint8Array(digest)].map(b => b.toString(16).padStart(2, '0')).join('');
+}
+
+async function uploadFileDirect(file, category, tags, notes) {
+    const checksum = await sha256Hex(file);
+    
+    // 1. Pedir a Django los parámetros firmados
+    const signed = await postJson('/api/documents/upload/sign/', {
+        name: file.name,
+        size: file.size,
+        checksum
+    });
+    
+    // El almacenamiento no acepta subidas directas: usar el protocolo por partes
+    if (signed.direct === false) {
+        return uploadFileResumable(file, category, tags, notes);
+    }
+    
+    // El mismo contenido ya está almacenado: solo se registra el documento
+    if (signed.duplicate) {
+        const linked = await postJson('/api/documents/upload/finalize/', {
+            checksum,
+            name: file.name,
+            category,
+            tags,
+            notes
+        });
+        return linked.document;
+    }
+    
+    // 2. Subir el archivo directamente al almacenamiento
+    const formData = new FormData();
+    Object.entries(signed.fields).forEach(([key, value]) => formData.append(key, value));
+    formData.append('file', file);
+    
+    const uploadResponse = await fetch(signed.upload_url, {
+        method: 'POST',
+        body: formData
+    });
+    const upload = await uploadResponse.json();
+    if (!uploadResponse.ok) {
+        throw new Error((upload.error && upload.error.message) || `Error ${uploadResponse.status} subiendo ${file.name}`);
+    }
+    
+    // 3. Registrar el documento (Django verifica la firma de la respuesta)
+    const finalized = await postJson('/api/documents/upload/finalize/', {
+        upload,
+        checksum,
+        name: file.name,
+        category,
+        tags,
+        notes
+    });
+    return finalized.document;
+}
+
+// Archivos a partir de este tamaño se suben por partes y pueden reanudarse
+const RESUMABLE_THRESHOLD = 20 * 1024 * 1024;
+const MAX_CHUNK_RETRIES = 5;
+// Archivos que se suben a la vez
+const UPLOAD_CONCURRENCY = 3;
+
+async function getUploadOffset(uploadUrl) {
+    const response = await fetch(uploadUrl, { method: 'HEAD' });
+    if (!response.ok) throw new Error(`Error ${response.status} consultando la subida`);
+    return parseInt(response.headers.get('Upload-Offset'), 10);
+}
+
+async function uploadFileResumable(file, category, tags, notes, onProgress) {
+    // 1. Crear la sesión de subida
+    const created = await postJson('/api/uploads/', {
+        name: file.name,
+        size: file.size,
+        category,
+        tags,
+        notes
+    });
+    const uploadUrl = `/api/uploads/${created.upload.id}/`;
+    const chunkSize = created.upload.chunk_size;
+    
+    // 2. Enviar las partes; ante un error se consulta el offset y se reanuda
+    let offset = 0;
+    let retries = 0;
+    while (true) {
+        const chunk = file.slice(offset, offset + chunkSize);
+        try {
+            const response = await fetch(uploadUrl, {
+                method: 'PATCH',
+                headers: {
+                    'Content-Type': 'application/offset+octet-stream',
+                    'Upload-Offset': String(offset),
+                    'X-CSRFToken': getCookie('csrftoken')
+                },
+                body: chunk
+            });
+            const data = await response.json();
+            
+            if (response.status === 409) {
+                offset = data.offset;
+                continue;
+            }
+            if (!response.ok || !data.success) {
+                throw new Error(data.error || `Error ${response.status}`);
+            }
+            
+            offset = data.upload.offset;
+            retries = 0;
+            if (onProgress) onProgress(offset / file.size);
+            if (data.document) return data.document;
+        } catch (error) {
+            if (++retries > MAX_CHUNK_RETRIES) throw error;
+            console.warn(`Reintentando ${file.name} (${retries}/${MAX_CHUNK_RETRIES}):`, error);
+            await new Promise(resolve => setTimeout(resolve, 1000 * retries));
+            try {
+                offset = await getUploadOffset(uploadUrl);
+            } catch (headError) {
+                console.warn('No se pudo consultar el offset:', headError);
+            }
+        }
+    }
+}
+
 async function uploadDocuments() {
     if (!selectedFiles || selectedFiles.length === 0) {
         alert('Por favor, selecciona al menos un archivo');
@@ -311,86 +516,79 @@ async function uploadDocuments() {
     const uploadBtn = document.getElementById('uploadBtn');
     if (uploadBtn) uploadBtn.disabled = true;
     
-    try {
-        const formData = new FormData();
-        
-        for (let i = 0; i < selectedFiles.length; i++) {
-            formData.append('files[]', selectedFiles[i]);
-            formData.append('files', selectedFiles[i]);
-        }
-        
-        if (category && category !== 'none' && category !== 'undefined') {
-            formData.append('category', category);
-        }
-        if (tags) formData.append('tags', tags);
-        if (notes) formData.append('notes', notes);
-        
-        console.log('=== CONTENIDO DE FORMDATA ===');
-        for (let pair of formData.entries()) {
-            console.log(pair[0] + ': ', pair[1]);
-        }
-        
-        const csrftoken = getCookie('csrftoken');
-        console.log('CSRF Token:', csrftoken);
-        
-        if (progressFill) progressFill.style.width = '30%';
-        if (progressText) progressText.textContent = 'Enviando...';
-        
-        const response = await fetch('/api/documents/upload/', {
-            method: 'POST',
-            headers: {
-                'X-CSRFToken': csrftoken,
-            },
-            body: formData
-        });
-        
-        console.log('Respuesta recibida. Estado:', response.status);
-        
-        const responseText = await response.text();
-        console.log('Respuesta en texto:', responseText);
-        
-        let data;
-        try {
-            data = JSON.parse(responseText);
-        } catch (e) {
-            console.error('Error parseando JSON:', e);
-            throw new Error('Respuesta inválida del servidor');
+    const files = Array.from(selectedFiles);
+    const total = files.length;
+    const progress = new Array(total).fill(0);
+    const showProgress = () => {
+        const done = progress.reduce((sum, fraction) => sum + fraction, 0);
+        if (progressFill) progressFill.style.width = `${Math.round((done / total) * 100)}%`;
+    };
+    
+    // Cada archivo va directo al almacenamiento; Django solo firma y registra.
+    // Varios a la vez: el total no es la suma de las latencias de cada archivo.
+    const uploadOne = async (file, i) => {
+        if (file.size >= RESUMABLE_THRESHOLD) {
+            return uploadFileResumable(file, category, tags, notes, fraction => {
+                progress[i] = fraction;
+                showProgress();
+            });
         }
-        
-        console.log('Datos parseados:', data);
-        
-        if (!response.ok) {
-            throw new Error(data.error || `Error ${response.status}`);
+        return uploadFileDirect(file, category, tags, notes);
+    };
+    
+    // Resultado por archivo, como Promise.allSettled: un error no cancela el resto
+    const results = new Array(total);
+    let next = 0;
+    let finished = 0;
+    const worker = async () => {
+        while (next < total) {
+            const i = next++;
+            try {
+                results[i] = { status: 'fulfilled', value: await uploadOne(files[i], i) };
+            } catch (error) {
+                console.error(`❌ Error subiendo ${files[i].name}:`, error);
+                results[i] = { status: 'rejected', reason: error };
+            }
+            progress[i] = 1;
+            finished++;
+            showProgress();
+            if (progressText) progressText.textContent = `Subiendo... (${finished}/${total})`;
         }
+    };
+    if (progressText) progressText.textContent = `Subiendo... (0/${total})`;
+    await Promise.all(Array.from({ length: Math.min(UPLOAD_CONCURRENCY, total) }, worker));
+    
+    const uploaded = results.filter(result => result.status === 'fulfilled');
+    const failed = results
+        .map((result, i) => result.status === 'rejected' ? `${files[i].name}: ${result.reason.message}` : null)
+        .filter(Boolean);
+    
+    if (failed.length === 0) {
+        if (progressText) progressText.textContent = '¡Completado!';
         
-        if (data.success) {
-            if (progressFill) progressFill.style.width = '100%';
-            if (progressText) progressText.textContent = '¡Completado!';
+        setTimeout(() => {
+            if (progressContainer) progressContainer.style.display = 'none';
+            if (progressFill) progressFill.style.width = '0%';
+            if (uploadBtn) uploadBtn.disabled = false;
             
-            setTimeout(() => {
-                if (progressContainer) progressContainer.style.display = 'none';
-                if (progressFill) progressFill.style.width = '0%';
-                if (uploadBtn) uploadBtn.disabled = false;
-                
-                resetUploadForm();
-                
-                alert(data.message || '✅ Documentos subidos exitosamente!');
-                
-                window.location.reload();
-                
-            }, 1000);
+            resetUploadForm();
             
-        } else {
-            throw new Error(data.error || 'Error desconocido');
-        }
-        
-    } catch (error) {
-        console.error('❌ Error completo:', error);
-        
-        if (progressContainer) progressContainer.style.display = 'none';
-        if (uploadBtn) uploadBtn.disabled = false;
-        
-        alert(`❌ Error al subir: ${error.message}`);
+            alert(`✅ Se subieron ${uploaded.length} documentos exitosamente`);
+            
+            window.location.reload();
+            
+        }, 1000);
+        return;
+    }
+    
+    if (progressContainer) progressContainer.style.display = 'none';
+    if (uploadBtn) uploadBtn.disabled = false;
+    
+    alert(`${uploaded.length ? `✅ Se subieron ${uploaded.length} documentos.\n` : ''}❌ Error al subir ${failed.length}:\n${failed.join('\n')}`);
+    if (uploaded.length) {
+        // Solo quedan seleccionados los que fallaron, para reintentarlos
+        handleFiles(files.filter((file, i) => results[i].status === 'rejected'));
+        refreshDashboard();
     }
 }
 
@@ -431,7 +629,7 @@ function displaySearchResults(results) {
         <div class="documents-grid">
             ${results.map(doc => `
                 <div class="document-card">
-                    <div class="document-icon">${doc.icon}</div>
+                    ${documentThumbnail(doc)}
                     <div class="document-name">${doc.name}</div>
                     <div class="document-info">
                         <span>${doc.size}</span>
@@ -444,41 +642,53 @@ function displaySearchResults(results) {
     `;
 }
 
-// ============================================
-// FUNCIONES PARA CATEGORÍAS
-// ============================================
+let searchController = null;
 
-async function updateCategorySelect() {
+async function searchDocuments(term) {
+    const container = document.getElementById('searchResults');
+    if (!term) {
+        if (container) container.innerHTML = '<p class="no-results">Ingresa un término de búsqueda para ver resultados</p>';
+        return;
+    }
+    
+    // Cancelar la búsqueda anterior si todavía no respondió
+    if (searchController) searchController.abort();
+    searchController = new AbortController();
+    
     try {
-        console.log('Cargando categorías del usuario...');
-        
-        const response = await fetch('/api/categories/user/');
-        
+        const response = await fetch(`/api/documents/search/?q=${encodeURIComponent(term)}`, {
+            signal: searchController.signal
+        });
         if (!response.ok) {
-            console.warn('No se pudieron cargar las categorías. Usando opciones por defecto.');
-            return;
+            throw new Error(`HTTP error ${response.status}`);
         }
-        
         const data = await response.json();
-        console.log('Categorías recibidas:', data);
-        
-        if (data.success && data.categories && data.categories.length > 0) {
-            const categorySelect = document.getElementById('categorySelect');
-            if (categorySelect) {
-                let options = '<option value="none">Sin categoría</option>';
-                data.categories.forEach(cat => {
-                    options += `<option value="${cat.id}">${cat.name} ${cat.icon}</option>`;
-                });
-                options += '<option value="otros">Otros</option>';
-                categorySelect.innerHTML = options;
-                console.log('Select de categorías actualizado');
-            }
+        if (data.success) {
+            displaySearchResults(data.documents);
         }
     } catch (error) {
-        console.error('Error cargando categorías:', error);
+        if (error.name !== 'AbortError') {
+            console.error('Error buscando documentos:', error);
+        }
     }
 }
 
+// ============================================
+// FUNCIONES PARA CATEGORÍAS
+// ============================================
+
+function renderCategorySelect(categories) {
+    const categorySelect = document.getElementById('categorySelect');
+    if (!categorySelect || categories.length === 0) return;
+    
+    let options = '<option value="none">Sin categoría</option>';
+    categories.forEach(cat => {
+        options += `<option value="${cat.id}">${cat.name} ${cat.icon}</option>`;
+    });
+    options += '<option value="otros">Otros</option>';
+    categorySelect.innerHTML = options;
+}
+
 // ============================================
 // INICIALIZACIÓN PRINCIPAL
 // ============================================
@@ -496,6 +706,20 @@ document.addEventListener('DOMContentLoaded', function() {
     const fileInput = document.getElementById('fileInput');
     const uploadBtn = document.getElementById('uploadBtn');
     
+    // ============================================
+    // PÁGINAS SIGUIENTES DE LA BIBLIOTECA
+    // ============================================
+    const loadMoreBtn = document.getElementById('loadMoreBtn');
+    if (loadMoreBtn) {
+        loadMoreBtn.addEventListener('click', loadMoreDocuments);
+        // Al hacer scroll hasta el botón se carga la página siguiente sola
+        if ('IntersectionObserver' in window) {
+            new IntersectionObserver(entries => {
+                if (entries.some(entry => entry.isIntersecting)) loadMoreDocuments();
+            }, { rootMargin: '200px' }).observe(loadMoreBtn);
+        }
+    }
+    
     // ============================================
     // PREVIEW DE ARCHIVOS
     // ============================================
@@ -565,6 +789,7 @@ document.addEventListener('DOMContentLoaded', function() {
                         <div class="category-icon">${data.category.icon}</div>
                         <h3>${data.category.name}</h3>
                         <p class="category-count">${data.category.document_count} documentos</p>
+                        <button class="download-category-btn" onclick="event.stopPropagation(); downloadCategoryZip(${data.category.id})" title="Descargar en ZIP">⬇️</button>
                         <button class="delete-category-btn" data-id="${data.category.id}" title="Eliminar categoría">❌</button>
                     `;
                     grid.appendChild(categoryCard);
@@ -611,8 +836,12 @@ document.addEventListener('DOMContentLoaded', function() {
         confirmDeleteBtn.addEventListener('click', async function() {
             if (!categoryToDelete) return;
             
+            // Opcional: eliminar los documentos de la categoría en la misma petición
+            const deleteDocuments = document.getElementById('deleteCategoryDocuments');
+            const query = deleteDocuments && deleteDocuments.checked ? '?delete_documents=1' : '';
+            
             try {
-                const response = await fetch(`/api/categories/${categoryToDelete}/delete/`, {
+                const response = await fetch(`/api/categories/${categoryToDelete}/delete/${query}`, {
                     method: 'DELETE',
                     headers: {
                         'X-CSRFToken': getCookie('csrftoken')
@@ -632,6 +861,8 @@ document.addEventListener('DOMContentLoaded', function() {
                     
                     deleteModal.style.display = 'none';
                     categoryToDelete = null;
+                    if (deleteDocuments) deleteDocuments.checked = false;
+                    refreshDashboard();
                     alert('Categoría eliminada exitosamente');
                 } else {
                     alert('Error: ' + data.error);
@@ -666,12 +897,6 @@ document.addEventListener('DOMContentLoaded', function() {
                 search: 'Búsqueda'
             };
             document.querySelector('.page-title').textContent = titles[section];
-            
-            if (section === 'documents') {
-                loadAllDocuments();
-            } else if (section === 'dashboard') {
-                loadRecentDocuments();
-            }
         });
     });
 
@@ -737,18 +962,16 @@ document.addEventListener('DOMContentLoaded', function() {
     const searchInput = document.getElementById('searchInput');
     const mainSearchInput = document.getElementById('mainSearchInput');
 
+    let searchTimer = null;
+
     [searchInput, mainSearchInput].forEach(input => {
         if (input) {
             input.addEventListener('input', (e) => {
-                const term = e.target.value.toLowerCase();
-                const results = documents.filter(doc => 
-                    doc.name.toLowerCase().includes(term) ||
-                    doc.category.toLowerCase().includes(term)
-                );
+                const term = e.target.value.trim();
                 
-                if (input === mainSearchInput) {
-                    displaySearchResults(results);
-                }
+                // Esperar a que la usuaria deje de escribir antes de consultar al servidor
+                clearTimeout(searchTimer);
+                searchTimer = setTimeout(() => searchDocuments(term), 250);
             });
         }
     });
@@ -757,11 +980,16 @@ document.addEventListener('DOMContentLoaded', function() {
     // CARGA INICIAL
     // ============================================
     
-    loadRecentDocuments();
-    loadAllDocuments();
-    updateCategorySelect();
+    // Los datos vienen en la página (json_script); sin ellos se piden al servidor
+    const bootstrapData = document.getElementById('bootstrap-data');
+    if (bootstrapData) {
+        hydrateDashboard(JSON.parse(bootstrapData.textContent));
+    } else {
+        refreshDashboard();
+    }
 });
 
 // Hacer funciones disponibles globalmente
 window.downloadDocument = downloadDocument;
+window.downloadCategoryZip = downloadCategoryZip;
 window.deleteDocument = deleteDocument;
\ No newline at end of file
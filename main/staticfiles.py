@@ -0,0 +1,25 @@
+"""
+Almacenamiento de los archivos estáticos (STORAGES['staticfiles']).
+
+CompressedManifestStaticFilesStorage de WhiteNoise: collectstatic agrega el
+hash del contenido al nombre de cada archivo y escribe sus versiones .gz y
+.br. Sin manifiesto (desarrollo y pruebas, donde no se corre collectstatic)
+{% static %} usa los nombres originales; con STATICFILES_MANIFEST_REQUIRED
+(por defecto sin DEBUG) falla, porque en producción significa que el
+manifiesto no llegó al despliegue (ver vercel.json y build_files.sh).
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    def stored_name(self, name):
+        if not self.hashed_files:
+            if settings.STATICFILES_MANIFEST_REQUIRED:
+                raise ImproperlyConfigured(
+                    f'Falta el manifiesto de archivos estáticos en {self.location}: '
+                    'corré collectstatic (build_files.sh) antes de desplegar'
+                )
+            return name
+        return super().stored_name(name)
@@ -0,0 +1,542 @@
+"""
+Almacenamiento de los archivos de los documentos.
+
+Las vistas solo hablan con `get_storage()`; el backend concreto se elige
+con DOCUMENT_STORAGE_BACKEND:
+
+- CloudinaryStorage (por defecto): los archivos viven en Cloudinary y las
+  descargas redirigen a su CDN. Las URLs públicas se calculan una sola vez
+  al subir (`delivery_urls`) y se guardan en el Document; las firmadas con
+  vencimiento (DOCUMENT_SIGNED_URLS) se reutilizan desde un caché en memoria.
+- LocalStorage: los archivos viven en LOCAL_STORAGE_ROOT y las descargas
+  se sirven con FileResponse (os.sendfile vía wsgi.file_wrapper) o se
+  delegan al servidor web con X-Accel-Redirect / X-Sendfile.
+"""
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from functools import lru_cache
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.shortcuts import redirect
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_etags
+from django.utils.module_loading import import_string
+
+from .metrics import InstrumentedStorage
+
+
+# Máximo de public_ids por llamada a la API de borrado de Cloudinary
+DELETE_BATCH_SIZE = 100
+
+
+# El SDK de Cloudinary y httpx tardan decenas de ms en importarse: se cargan
+# con la primera operación que los necesita, no al arrancar el proceso
+# (importa en el arranque en frío de Vercel).
+
+@lru_cache(maxsize=None)
+def cloudinary_sdk():
+    """Paquete cloudinary con uploader/api/utils importados y configurado una sola vez"""
+    import cloudinary
+    import cloudinary.api
+    import cloudinary.exceptions
+    import cloudinary.uploader
+    import cloudinary.utils
+
+    credentials = settings.CLOUDINARY_STORAGE
+    cloudinary.config(
+        cloud_name=credentials['CLOUD_NAME'],
+        api_key=credentials['API_KEY'],
+        api_secret=credentials['API_SECRET'],
+        secure=True,
+    )
+    return cloudinary
+
+
+@lru_cache(maxsize=None)
+def get_httpx():
+    try:
+        import httpx
+    except ImportError:  # Sin httpx las subidas asíncronas usan el SDK en un hilo
+        return None
+    return httpx
+
+
+class TTLCache:
+    """
+    Caché LRU en memoria con vencimiento por entrada, seguro entre hilos.
+
+    Las entradas vencidas se descartan al leerlas; las menos usadas salen
+    cuando se supera `maxsize`.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_set(self, key, factory):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > now:
+                    self._data.move_to_end(key)
+                    return value
+                del self._data[key]
+
+        value = factory()
+        with self._lock:
+            self._data[key] = (value, now + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class StorageBackend:
+    # Si el navegador puede subir directamente al almacenamiento con una firma
+    supports_direct_upload = False
+
+    def upload(self, file, public_id):
+        """Guarda `file` (objeto archivo o ruta) y retorna el public_id definitivo"""
+        raise NotImplementedError
+
+    async def aupload(self, file, public_id):
+        """Versión para vistas async; por defecto ejecuta upload() en un hilo"""
+        return await sync_to_async(self.upload, thread_sensitive=False)(file, public_id)
+
+    def destroy(self, public_id):
+        raise NotImplementedError
+
+    def destroy_many(self, public_ids):
+        """Elimina varios archivos; retorna {public_id: error} de los que fallaron"""
+        failed = {}
+        for public_id in public_ids:
+            try:
+                self.destroy(public_id)
+            except Exception as e:
+                failed[public_id] = str(e)
+        return failed
+
+    def delivery_urls(self, public_id):
+        """
+        URLs canónicas de un archivo, calculadas al subirlo y guardadas en
+        Document.delivery_url / Document.download_url. Vacías si el backend
+        las resuelve por su cuenta en url() / download_response().
+        """
+        return {'delivery_url': '', 'download_url': ''}
+
+    def url(self, document):
+        """URL para ver el archivo desde los listados"""
+        raise NotImplementedError
+
+    def open(self, public_id):
+        """Abre un archivo guardado para leerlo (FileNotFoundError si ya no existe)"""
+        raise NotImplementedError
+
+    def open_stream(self, public_id):
+        """
+        Como open(), pero solo para leer de principio a fin: el backend puede
+        entregar la conexión misma en lugar de copiar el archivo antes.
+        """
+        return self.open(public_id)
+
+    def preview_url(self, document):
+        """URL de la miniatura de un documento que tiene `preview`"""
+        return reverse('document_preview', args=[document.id])
+
+    def preview_response(self, request, document):
+        """Respuesta HTTP con la miniatura del documento"""
+        return redirect(self.preview_url(document))
+
+    def download_response(self, request, document):
+        """Respuesta HTTP que entrega el archivo como descarga"""
+        raise NotImplementedError
+
+    def sign_upload(self, public_id):
+        """
+        Subida directa desde el navegador (supports_direct_upload): retorna
+        {'upload_url': ..., 'fields': {...}} con los campos firmados del formulario
+        """
+        raise NotImplementedError
+
+    def verify_upload(self, public_id, version, signature):
+        """Si la respuesta de una subida directa viene firmada por el almacenamiento"""
+        raise NotImplementedError
+
+    def stored_size(self, public_id):
+        """Tamaño en bytes de un archivo guardado, según el propio almacenamiento"""
+        raise NotImplementedError
+
+
+class CloudinaryStorage(StorageBackend):
+    supports_direct_upload = True
+
+    def __init__(self, signed=None, signed_ttl=None):
+        self.signed = settings.DOCUMENT_SIGNED_URLS if signed is None else signed
+        self.signed_ttl = signed_ttl or settings.DOCUMENT_SIGNED_URL_TTL
+        # Una URL sale del caché con al menos la mitad de su vigencia por delante
+        self.signed_urls = TTLCache(settings.DOCUMENT_SIGNED_URL_CACHE_SIZE, self.signed_ttl / 2)
+
+    def upload_options(self, file, public_id):
+        options = {
+            'resource_type': "raw",
+            'public_id': public_id,
+            'overwrite': True,
+            'invalidate': True,
+        }
+        if isinstance(file, str):
+            options['chunk_size'] = settings.CHUNKED_UPLOAD_CHUNK_SIZE
+        else:
+            options.update(
+                folder="documents/",
+                use_filename=False,  # No usar el nombre del archivo automáticamente
+                unique_filename=True,
+            )
+        return options
+
+    def upload(self, file, public_id):
+        # upload_large sube por partes; para archivos chicos hace una sola petición
+        uploader = cloudinary_sdk().uploader
+        upload = uploader.upload_large if isinstance(file, str) else uploader.upload
+        return upload(file, **self.upload_options(file, public_id))['public_id']
+
+    async def aupload(self, file, public_id):
+        # Las rutas (subidas por partes) siguen con upload_large del SDK
+        httpx = get_httpx()
+        if httpx is None or isinstance(file, str):
+            return await super().aupload(file, public_id)
+
+        # Misma petición firmada que arma cloudinary.uploader.upload, enviada con httpx
+        cloudinary = cloudinary_sdk()
+        options = self.upload_options(file, public_id)
+        params = cloudinary.utils.cleanup_params(cloudinary.utils.build_upload_params(**options))
+        params = cloudinary.utils.sign_request(params, options)
+        file.seek(0)
+        async with httpx.AsyncClient(timeout=settings.STORAGE_HTTP_TIMEOUT) as client:
+            response = await client.post(
+                cloudinary.utils.cloudinary_api_url('upload', **options),
+                data={key: value for key, value in params.items() if value},
+                files={'file': (os.path.basename(file.name), file)},
+            )
+        result = response.json()
+        if 'error' in result:
+            raise cloudinary.exceptions.Error(result['error']['message'])
+        return result['public_id']
+
+    def destroy(self, public_id):
+        cloudinary_sdk().uploader.destroy(public_id, resource_type="raw")
+
+    def destroy_many(self, public_ids):
+        api = cloudinary_sdk().api
+        failed = {}
+        for start in range(0, len(public_ids), DELETE_BATCH_SIZE):
+            batch = public_ids[start:start + DELETE_BATCH_SIZE]
+            try:
+                deleted = api.delete_resources(batch, resource_type="raw").get('deleted', {})
+            except Exception as e:
+                failed.update((public_id, str(e)) for public_id in batch)
+                continue
+            for public_id in batch:
+                # 'not_found' también sirve: el archivo ya no existe
+                status = deleted.get(public_id)
+                if status not in ('deleted', 'not_found'):
+                    failed[public_id] = status or 'Sin respuesta del almacenamiento'
+        return failed
+
+    def delivery_urls(self, public_id):
+        if self.signed:
+            # Las firmadas vencen: no se guardan en la BD
+            return super().delivery_urls(public_id)
+        utils = cloudinary_sdk().utils
+        return {
+            'delivery_url': utils.cloudinary_url(public_id, resource_type="raw")[0],
+            # fl_attachment hace que el CDN responda con Content-Disposition: attachment
+            'download_url': utils.cloudinary_url(public_id, resource_type="raw", flags="attachment")[0],
+        }
+
+    def signed_url(self, public_id, attachment=False):
+        """URL de descarga privada que vence en DOCUMENT_SIGNED_URL_TTL segundos"""
+        def build():
+            return cloudinary_sdk().utils.private_download_url(
+                public_id, '',
+                resource_type="raw",
+                attachment=attachment,
+                expires_at=int(time.time()) + self.signed_ttl,
+            )
+        return self.signed_urls.get_or_set((public_id, attachment), build)
+
+    def url(self, document):
+        if self.signed:
+            return self.signed_url(str(document.file))
+        # Documentos anteriores a delivery_url (ver refresh_document_urls)
+        return document.delivery_url or self.delivery_urls(str(document.file))['delivery_url']
+
+    def download_response(self, request, document):
+        if self.signed:
+            return redirect(self.signed_url(str(document.file), attachment=True))
+        return redirect(document.download_url or self.delivery_urls(str(document.file))['download_url'])
+
+    def sign_upload(self, public_id):
+        cloudinary = cloudinary_sdk()
+        config = cloudinary.config()
+        params = {
+            'public_id': public_id,
+            'timestamp': int(time.time()),
+        }
+        signature = cloudinary.utils.api_sign_request(params, config.api_secret)
+        upload_url = settings.CLOUDINARY_UPLOAD_URL or cloudinary.utils.cloudinary_api_url(
+            'upload',
+            resource_type='raw'
+        )
+        return {
+            'upload_url': upload_url,
+            'fields': {**params, 'api_key': config.api_key, 'signature': signature},
+        }
+
+    def verify_upload(self, public_id, version, signature):
+        return cloudinary_sdk().utils.verify_api_response_signature(public_id, version, signature)
+
+    def stored_size(self, public_id):
+        # explicit() es de la API de subidas: no cuenta para el límite por hora de la Admin API
+        return cloudinary_sdk().uploader.explicit(public_id, type='upload', resource_type='raw')['bytes']
+
+    def open_stream(self, public_id):
+        url = self.signed_url(public_id) if self.signed else self.delivery_urls(public_id)['delivery_url']
+        try:
+            return urllib.request.urlopen(url, timeout=settings.STORAGE_HTTP_TIMEOUT)
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                raise FileNotFoundError(public_id) from e
+            raise
+
+    def open(self, public_id):
+        # En memoria hasta 8 MB; los archivos más grandes pasan a un temporal en disco
+        source = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        try:
+            with self.open_stream(public_id) as response:
+                shutil.copyfileobj(response, source)
+        except BaseException:
+            source.close()
+            raise
+        source.seek(0)
+        return source
+
+    def preview_url(self, document):
+        if self.signed:
+            return self.signed_url(document.preview)
+        return document.preview_url or self.delivery_urls(document.preview)['delivery_url']
+
+
+def etag_matches(request, etag):
+    """
+    Si el If-None-Match de la petición incluye `etag`. Comparación débil
+    (RFC 9110): W/"x" coincide con "x"; '*' coincide con cualquiera.
+    """
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    if etags == ['*']:
+        return True
+    return etag.removeprefix('W/') in {tag.removeprefix('W/') for tag in etags}
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """
+    Vista de solo lectura de [start, start + length) de un archivo abierto.
+
+    Expone fileno() para que el servidor (p. ej. gunicorn) use os.sendfile
+    desde la posición actual y Content-Length; si no, read() nunca pasa del
+    final del rango.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+class LocalStorage(StorageBackend):
+    """
+    Archivos en disco local para instalaciones propias.
+
+    LOCAL_STORAGE_OFFLOAD = 'x-accel-redirect' (nginx) o 'x-sendfile'
+    (Apache/lighttpd) delega el envío al servidor web, que también resuelve
+    los Range. Sin offload se responde con FileResponse.
+    """
+
+    def __init__(self, root=None, offload=None, accel_prefix=None):
+        self.root = os.path.abspath(root or settings.LOCAL_STORAGE_ROOT)
+        self.offload = (offload if offload is not None else settings.LOCAL_STORAGE_OFFLOAD).lower()
+        self.accel_prefix = accel_prefix or settings.LOCAL_STORAGE_ACCEL_PREFIX
+
+    def path(self, public_id):
+        path = os.path.abspath(os.path.join(self.root, public_id))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise SuspiciousFileOperation(f'Ruta fuera del almacenamiento: {public_id}')
+        return path
+
+    def upload(self, file, public_id):
+        path = self.path(public_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        if isinstance(file, str):
+            shutil.copyfile(file, tmp_path)
+        else:
+            file.seek(0)
+            with open(tmp_path, 'wb') as destination:
+                chunks = file.chunks() if hasattr(file, 'chunks') else iter(lambda: file.read(1024 * 1024), b'')
+                for chunk in chunks:
+                    destination.write(chunk)
+        os.replace(tmp_path, path)
+        return public_id
+
+    def destroy(self, public_id):
+        try:
+            os.remove(self.path(public_id))
+        except FileNotFoundError:
+            pass
+
+    def url(self, document):
+        return reverse('download_document', args=[document.id])
+
+    def open(self, public_id):
+        return open(self.path(public_id), 'rb')
+
+    def stored_size(self, public_id):
+        return os.path.getsize(self.path(public_id))
+
+    def preview_response(self, request, document):
+        path = self.path(document.preview)
+        stat = os.stat(path)
+        etag = f'"{stat.st_size:x}-{int(stat.st_mtime_ns):x}"'
+        if etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(path, 'rb'), content_type='image/webp')
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, max_age=settings.PREVIEW_CACHE_SECONDS)
+        return response
+
+    def etag(self, document, stat):
+        # El SHA-256 identifica el contenido; sin él, tamaño + fecha de modificación
+        if document.checksum:
+            return f'"{document.checksum}"'
+        return f'"{stat.st_size:x}-{int(stat.st_mtime_ns):x}"'
+
+    def download_response(self, request, document):
+        path = self.path(str(document.file))
+        stat = os.stat(path)
+        etag = self.etag(document, stat)
+
+        if etag_matches(request, etag):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        if self.offload == 'x-accel-redirect':
+            response = HttpResponse(content_type='application/octet-stream')
+            response['X-Accel-Redirect'] = self.accel_prefix.rstrip('/') + '/' + quote(str(document.file))
+        elif self.offload == 'x-sendfile':
+            response = HttpResponse(content_type='application/octet-stream')
+            response['X-Sendfile'] = path
+        else:
+            response = self.file_response(request, path, stat.st_size, etag)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Accept-Ranges'] = 'bytes'
+        response['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(document.name)}"
+        return response
+
+    def file_response(self, request, path, size, etag):
+        byte_range = self.parse_range(request, size, etag)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        file = open(path, 'rb')
+        if byte_range is None:
+            return FileResponse(file, content_type='application/octet-stream')
+
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(RangeFile(file, start, length), status=206, content_type='application/octet-stream')
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        return response
+
+    @staticmethod
+    def parse_range(request, size, etag):
+        """
+        Retorna (inicio, fin) del Range pedido, None para enviar el archivo
+        completo, o False si el rango no se puede satisfacer.
+        """
+        header = request.headers.get('Range')
+        if not header:
+            return None
+        # If-Range: solo se respeta el rango si el contenido no cambió
+        if_range = request.headers.get('If-Range')
+        if if_range and if_range != etag:
+            return None
+
+        match = RANGE_RE.match(header.strip())
+        if not match or match.groups() == ('', ''):
+            # Varios rangos o sintaxis desconocida: se ignora el Range
+            return None
+
+        first, last = match.groups()
+        if first == '':
+            length = int(last)
+            if length == 0:
+                return False
+            return max(size - length, 0), size - 1
+
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start >= size or start > end:
+            return False
+        return start, end
+
+
+@lru_cache(maxsize=None)
+def get_storage():
+    return InstrumentedStorage(import_string(settings.DOCUMENT_STORAGE_BACKEND)())
@@ -9,17 +9,39 @@ urlpatterns = [
     path('platform/', views.platform, name='platform'),
     path('logout/', views.logout_view, name='logout'),
     
+    # Datos iniciales del panel (los mismos que trae /platform/)
+    path('api/bootstrap/', views.bootstrap, name='bootstrap'),
+    
     # API para categorías
     path('api/categories/create/', views.create_category, name='create_category'),
     path('api/categories/<int:category_id>/delete/', views.delete_category, name='delete_category'),
     path('api/categories/user/', views.get_user_categories, name='get_user_categories'),  # NUEVA
     
+    # API para etiquetas
+    path('api/tags/', views.get_user_tags, name='get_user_tags'),
+    
     # API para documentos
     path('api/documents/upload/', views.upload_document, name='upload_document'),
+    path('api/documents/upload/sign/', views.sign_document_upload, name='sign_document_upload'),
+    path('api/documents/upload/finalize/', views.finalize_document_upload, name='finalize_document_upload'),
     path('api/documents/', views.get_documents, name='get_documents'),
     path('api/documents/recent/', views.get_recent_documents, name='get_recent_documents'),
+    path('api/documents/search/', views.search_documents, name='search_documents'),
     path('api/documents/<int:document_id>/download/', views.download_document, name='download_document'),
+    path('api/documents/<int:document_id>/preview/', views.document_preview, name='document_preview'),
     path('api/documents/<int:document_id>/delete/', views.delete_document, name='delete_document'),
+    path('api/documents/export/', views.export_documents, name='export_documents'),
+    path('api/documents/bulk-delete/', views.bulk_delete_documents, name='bulk_delete_documents'),
+    
+    # Cola de trabajos, para el cron de Vercel
+    path('api/jobs/run/', views.run_jobs, name='run_jobs'),
+    
+    # Métricas para Prometheus
+    path('metrics', views.metrics, name='metrics'),
+    
+    # API para subidas reanudables por partes
+    path('api/uploads/', views.create_upload_session, name='create_upload_session'),
+    path('api/uploads/<uuid:session_id>/', views.upload_session, name='upload_session'),
 ]
 
 
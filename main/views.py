@@ -1,19 +1,36 @@
 from django.shortcuts import render, redirect
+from django.urls import reverse
 from django.contrib.auth import login as auth_login, logout as auth_logout
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, FileResponse, Http404
-from django.db.models import Sum, Count
+from django.http import HttpResponse, JsonResponse, Http404, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Count
 from django.utils import timezone
-from datetime import datetime, timedelta
-from .models import CustomUser, Category, Document
+from datetime import timedelta
+from collections import Counter
+from asgiref.sync import sync_to_async
+from .models import CustomUser, Category, Blob, Document, Tag, UploadSession, UserStats, parse_tags, sha256_file
+from .caching import cache_library_response
+from .metrics import REGISTRY
+from .pagination import DEFAULT_PAGE_SIZE, keyset_page, parse_page_size
+from .responses import StreamingJsonResponse, stream_without_blocking
+from . import exports, jobs, search
+from .storage import cloudinary_sdk, get_storage
 from django.views.decorators.csrf import csrf_exempt
-import cloudinary
-import cloudinary.uploader
-import cloudinary.utils
+from django.conf import settings
+import asyncio
+import hmac
+import io
 import json
+import logging
 import time
 import os
 import re
+from urllib.parse import quote
+
+
+logger = logging.getLogger(__name__)
 
 def index(request):
     return render(request, 'index.html')
@@ -25,18 +42,12 @@ def register(request):
         correo = request.POST.get('correo')
         password = request.POST.get('password')
 
-        print(f"🔍 REGISTRO - Datos recibidos:")
-        print(f"   Nombre: '{nombre}'")
-        print(f"   Apellido: '{apellido}'")
-        print(f"   Correo: '{correo}'")
-        print(f"   Password: '{password}' (longitud: {len(password) if password else 0})")
-
         if not all([nombre, apellido, correo, password]):
-            print("❌ Faltan campos")
+            logger.info('Registro rechazado: faltan campos')
             return render(request, 'register.html', {'error': 'Todos los campos son obligatorios'})
 
         if CustomUser.objects.filter(email=correo).exists():
-            print("❌ Usuario ya existe")
+            logger.info('Registro rechazado: el correo ya existe')
             return render(request, 'register.html', {'error': 'El correo ya está registrado'})
 
         try:
@@ -61,12 +72,10 @@ def register(request):
                     icon=cat['icon']
                 )
             
-            print(f"✅ Usuario registrado exitosamente: {user.email}")
+            logger.info('Usuario registrado', extra={'user_id': user.id})
             return redirect('login')
         except Exception as e:
-            print(f"❌ Error al crear usuario: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception('Error al crear usuario')
             return render(request, 'register.html', {'error': f'Error al registrar: {str(e)}'})
     
     return render(request, 'register.html')
@@ -76,63 +85,36 @@ def login_view(request):
         correo = request.POST.get('correo')
         password = request.POST.get('password')
         
-        print(f"🔍 LOGIN - Intentando con:")
-        print(f"   Correo: '{correo}'")
-        print(f"   Password: '{password}' (longitud: {len(password) if password else 0})")
-        
         try:
             user = CustomUser.objects.get(email=correo)
-            print(f"✅ Usuario encontrado: {user.email}")
-            print(f"   ID: {user.id}")
             
-            password_check = user.check_password(password)
-            print(f"   Verificación de password: {password_check}")
-            
-            if password_check:
-                auth_login(request, user)
-                print(f"✅ Login exitoso: {user.email}")
+            if user.check_password(password):
+                auth_login(request, user, backend='main.backends.EmailBackend')
+                logger.info('Login exitoso', extra={'user_id': user.id})
                 return redirect('platform')
             else:
-                print("❌ Contraseña incorrecta")
+                logger.info('Login fallido: contraseña incorrecta', extra={'user_id': user.id})
                 return render(request, 'login.html', {'error': 'Correo o contraseña incorrectos'})
         except CustomUser.DoesNotExist:
-            print("❌ Usuario no encontrado")
+            logger.info('Login fallido: usuario no encontrado')
             return render(request, 'login.html', {'error': 'Correo o contraseña incorrectos'})
     
     return render(request, 'login.html')
 
 @login_required(login_url='login')
 def platform(request):
-    categories = Category.objects.filter(user=request.user).order_by('-created_at')
-    
-    total_documents = Document.objects.filter(user=request.user).count()
-    total_categories = categories.count()
-    
-    today = timezone.now().date()
-    documents_today = Document.objects.filter(
-        user=request.user,
-        uploaded_at__date=today
-    ).count()
-    
-    total_size = Document.objects.filter(user=request.user).aggregate(
-        total=Sum('size')
-    )['total'] or 0
-    
-    if total_size < 1024:
-        size_display = f"{total_size} B"
-    elif total_size < 1024 * 1024:
-        size_display = f"{total_size / 1024:.0f} KB"
-    elif total_size < 1024 * 1024 * 1024:
-        size_display = f"{total_size / (1024 * 1024):.2f} MB"
-    else:
-        size_display = f"{total_size / (1024 * 1024 * 1024):.2f} GB"
+    # Los datos iniciales del panel van en la página (json_script): el script
+    # no necesita pedir documentos ni categorías al cargar
+    bootstrap = _bootstrap_payload(request.user)
+    stats = bootstrap['stats']
     
     context = {
-        'categories': categories,
-        'total_documents': total_documents,
-        'total_categories': total_categories,
-        'documents_today': documents_today,
-        'size_display': size_display,
+        'categories': bootstrap.pop('category_grid'),
+        'total_documents': stats['total_documents'],
+        'total_categories': stats['total_categories'],
+        'documents_today': stats['documents_today'],
+        'size_display': stats['size_display'],
+        'bootstrap': bootstrap,
     }
     
     return render(request, 'plataform.html', context)
@@ -152,11 +134,14 @@ def create_category(request):
             if not name or not name.strip():
                 return JsonResponse({'success': False, 'error': 'El nombre es obligatorio'}, status=400)
             
-            category = Category.objects.create(
-                user=request.user,
-                name=name.strip(),
-                icon=icon
-            )
+            with transaction.atomic():
+                category = Category.objects.create(
+                    user=request.user,
+                    name=name.strip(),
+                    icon=icon
+                )
+                UserStats.bump_version(request.user)
+            category = Category.objects.with_document_count().get(pk=category.pk)
             
             return JsonResponse({
                 'success': True,
@@ -177,45 +162,172 @@ def delete_category(request, category_id):
     if request.method == 'DELETE':
         try:
             category = Category.objects.get(id=category_id, user=request.user)
-            category.delete()
-            return JsonResponse({'success': True})
+            
+            # Documentos y categoría se eliminan juntos o no se elimina nada
+            with transaction.atomic():
+                # ?delete_documents=1 elimina también sus documentos (si no, quedan sin categoría)
+                results = []
+                if request.GET.get('delete_documents') in ('1', 'true'):
+                    results = _delete_documents(request.user, category.documents.all())
+                category.delete()
+                UserStats.bump_version(request.user)
+            return JsonResponse({'success': True, 'deleted': len(results), 'results': results})
         except Category.DoesNotExist:
             return JsonResponse({'success': False, 'error': 'Categoría no encontrada'}, status=404)
     
     return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
 
 @login_required(login_url='login')
-def get_user_categories(request):
+@cache_library_response
+async def get_user_categories(request):
     """Obtener categorías del usuario"""
     try:
-        categories = Category.objects.filter(user=request.user).order_by('name')
+        user = await request.auser()
+        categories = (
+            Category.objects.filter(user=user)
+            .with_document_count()
+            .order_by('name')
+        )
         
-        categories_data = []
-        for category in categories:
-            categories_data.append({
-                'id': category.id,
-                'name': category.name,
-                'icon': category.icon,
-                'document_count': category.document_count()
-            })
+        categories_data = [_serialize_category(category) async for category in categories]
         
         return JsonResponse({'success': True, 'categories': categories_data})
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 
+# Tamaño máximo por archivo
+MAX_UPLOAD_SIZE = 100 * 1024 * 1024
+
+
+def _resolve_category(user, category_id):
+    """Busca la categoría del usuario por ID o, si no es numérico, por nombre"""
+    category = None
+    if category_id and category_id != 'none' and category_id != 'undefined':
+        try:
+            # Primero intentar por ID
+            if category_id.isdigit():
+                category = Category.objects.get(id=int(category_id), user=user)
+            else:
+                # Si no es número, podría ser el nombre directamente
+                category_name = category_id
+                # Buscar por nombre exacto
+                category = Category.objects.filter(user=user).named(category_name).first()
+                if not category:
+                    logger.warning('Categoría no encontrada', extra={'category': category_name})
+        except (Category.DoesNotExist, ValueError) as e:
+            logger.warning('Error al buscar categoría', extra={'category': category_id, 'error': str(e)})
+            category = None
+    return category
+
+
+def _clean_checksum(value):
+    """Normaliza una huella SHA-256 en hexadecimal; '' si no es válida"""
+    value = (value or '').strip().lower()
+    return value if re.fullmatch(r'[0-9a-f]{64}', value) else ''
+
+
+def _build_public_id(user, file_name):
+    """Public ID de Cloudinary: documents/{user_id}_{timestamp}_{nombre_seguro}"""
+    # Obtener nombre base sin extensión
+    file_name_without_ext = os.path.splitext(file_name)[0]
+    # Crear un nombre seguro para Cloudinary
+    safe_name = re.sub(r'[^a-zA-Z0-9_-]', '_', file_name_without_ext)
+    return f"documents/{user.id}_{int(time.time())}_{safe_name}"
+
+
+def _save_uploaded_documents(user, category, stored, checksums, uploads, sizes, notes, tags):
+    """
+    Registra referencias a los blobs y crea todos los documentos en una sola
+    transacción. `uploads` son los public_id subidos en esta petición.
+    """
+    storage = get_storage()
+    try:
+        with transaction.atomic():
+            blobs = {}
+            redundant = []
+            references = Counter(checksums[index] for index, _ in stored)
+            for checksum, count in references.items():
+                if checksum in uploads:
+                    public_id = uploads[checksum]
+                    blob, created = Blob.register(user, checksum, public_id, sizes[checksum], count)
+                    if not created:
+                        redundant.append(public_id)
+                else:
+                    blob = Blob.acquire(user, checksum, count)
+                if blob is None:
+                    raise RuntimeError('El archivo se eliminó durante la subida, intenta de nuevo')
+                blobs[checksum] = blob
+            
+            urls = {
+                checksum: storage.delivery_urls(blob.public_id)
+                for checksum, blob in blobs.items()
+            }
+            docs = Document.objects.bulk_create([
+                Document(
+                    user=user,
+                    category=category,
+                    name=file.name,
+                    file=blobs[checksums[index]].public_id,
+                    blob=blobs[checksums[index]],
+                    checksum=checksums[index],
+                    size=file.size,
+                    notes=notes,
+                    tags=tags,
+                    **urls[checksums[index]]
+                )
+                for index, file in stored
+            ])
+            UserStats.record_upload(user, docs)
+            Tag.attach(user, docs, tags)
+            jobs.enqueue_previews(docs)
+            # Otra petición registró el mismo contenido primero
+            if redundant:
+                jobs.enqueue_destroy(redundant)
+            return docs
+    except Exception:
+        # Sin fila en la BD los archivos quedarían huérfanos en el almacenamiento
+        if uploads:
+            jobs.enqueue_destroy(uploads.values())
+        raise
+
+
+async def _upload_to_storage(user, to_upload):
+    """
+    Sube al almacenamiento los archivos nuevos de forma concurrente, como
+    máximo UPLOAD_MAX_WORKERS a la vez. Retorna (public_ids, errores) por checksum.
+    """
+    storage = get_storage()
+    limit = asyncio.Semaphore(settings.UPLOAD_MAX_WORKERS)
+    
+    async def upload(file):
+        async with limit:
+            return await storage.aupload(file, _build_public_id(user, file.name))
+    
+    checksums = list(to_upload)
+    outcomes = await asyncio.gather(
+        *(upload(to_upload[checksum]) for checksum in checksums),
+        return_exceptions=True
+    )
+    uploads = {}
+    upload_errors = {}
+    for checksum, outcome in zip(checksums, outcomes):
+        if isinstance(outcome, Exception):
+            logger.error('Error subiendo archivo', extra={'file': to_upload[checksum].name, 'error': str(outcome)})
+            upload_errors[checksum] = str(outcome)
+        else:
+            logger.debug('Archivo subido', extra={'file': to_upload[checksum].name, 'public_id': outcome})
+            uploads[checksum] = outcome
+    return uploads, upload_errors
+
+
 @login_required(login_url='login')
 @csrf_exempt
-def upload_document(request):
-    print(f"📤 SUBIENDO DOCUMENTO - Usuario: {request.user.email}")
-    print(f"📤 Método: {request.method}")
+async def upload_document(request):
+    user = await request.auser()
     
     if request.method == 'POST':
         try:
-            # DEBUG: Ver qué está llegando
-            print(f"📤 Keys en FILES: {list(request.FILES.keys())}")
-            print(f"📤 Keys en POST: {list(request.POST.keys())}")
-            
             # Intentar diferentes formas de obtener los archivos
             files = []
             if 'files[]' in request.FILES:
@@ -229,10 +341,8 @@ def upload_document(request):
                 for key in request.FILES.keys():
                     files.extend(request.FILES.getlist(key))
             
-            print(f"📤 Archivos encontrados: {len(files)}")
-            
             if not files:
-                print("❌ No se recibieron archivos")
+                logger.info('Subida sin archivos', extra={'user_id': user.id, 'fields': list(request.FILES.keys())})
                 return JsonResponse({'success': False, 'error': 'No se recibieron archivos'}, status=400)
             
             # Obtener otros datos
@@ -240,273 +350,861 @@ def upload_document(request):
             tags = request.POST.get('tags', '')
             notes = request.POST.get('notes', '')
             
-            print(f"📤 Datos recibidos:")
-            print(f"  - Categoría ID: {category_id}")
-            print(f"  - Tags: {tags}")
-            print(f"  - Notes: {notes}")
-            
             # Buscar categoría
-            category = None
-            if category_id and category_id != 'none' and category_id != 'undefined':
-                try:
-                    # Primero intentar por ID
-                    if category_id.isdigit():
-                        category = Category.objects.get(id=int(category_id), user=request.user)
-                        print(f"✅ Categoría encontrada por ID: {category.name}")
-                    else:
-                        # Si no es número, podría ser el nombre directamente
-                        category_name = category_id
-                        # Buscar por nombre exacto
-                        category = Category.objects.filter(
-                            user=request.user,
-                            name__iexact=category_name
-                        ).first()
-                        if category:
-                            print(f"✅ Categoría encontrada por nombre: {category.name}")
-                        else:
-                            print(f"⚠️  Categoría no encontrada: {category_name}")
-                except (Category.DoesNotExist, ValueError) as e:
-                    print(f"⚠️  Error al buscar categoría: {e}")
-                    category = None
+            category = await sync_to_async(_resolve_category)(user, category_id)
             
-            uploaded_docs = []
-            for file in files:
-                print(f"📤 Procesando archivo: {file.name} ({file.size} bytes)")
-                
-                # Validar tamaño - aumentado a 100MB
-                if file.size > 100 * 1024 * 1024:
-                    print(f"❌ Archivo demasiado grande: {file.name}")
-                    return JsonResponse({
-                        'success': False, 
+            # Validar tamaño - aumentado a 100MB. Los archivos rechazados no
+            # detienen el resto del lote.
+            results = {}
+            pending = []
+            for index, file in enumerate(files):
+                if file.size > MAX_UPLOAD_SIZE:
+                    logger.info('Archivo demasiado grande', extra={'file': file.name, 'size': file.size})
+                    results[index] = {
+                        'name': file.name,
+                        'success': False,
                         'error': f'El archivo {file.name} es demasiado grande (máximo 100MB)'
-                    }, status=400)
-                
-                # Obtener nombre base sin extensión
-                file_name_without_ext = os.path.splitext(file.name)[0]
-                # Crear un nombre seguro para Cloudinary
-                safe_name = re.sub(r'[^a-zA-Z0-9_-]', '_', file_name_without_ext)
-                
-                # Subir a Cloudinary como RAW explícitamente
-                upload_result = cloudinary.uploader.upload(
-                    file,
-                    folder="documents/",
-                    resource_type="raw",
-                    public_id=f"documents/{request.user.id}_{int(time.time())}_{safe_name}",
-                    overwrite=True,
-                    use_filename=False,  # No usar el nombre del archivo automáticamente
-                    unique_filename=True,
-                    invalidate=True
-                )
-                
-                print(f"✅ Resultado completo de Cloudinary: {upload_result}")
-                print(f"✅ Public ID: {upload_result.get('public_id')}")
-                print(f"✅ URL segura: {upload_result.get('secure_url')}")
-                print(f"✅ Versión: {upload_result.get('version')}")
-                print(f"✅ Resource type: {upload_result.get('resource_type')}")
-                
-                # Crear documento
-                doc = Document.objects.create(
-                    user=request.user,
-                    category=category,
-                    name=file.name,
-                    file=upload_result['public_id'],
-                    size=file.size,
-                    notes=notes,
-                    tags=tags
+                    }
+                else:
+                    pending.append((index, file))
+            
+            # Huella SHA-256 de cada archivo: el contenido que ya está
+            # almacenado (o repetido en el lote) no se vuelve a subir.
+            # Leer y hashear bloquea, así que corre fuera del event loop.
+            hashes = await asyncio.gather(*(
+                sync_to_async(sha256_file, thread_sensitive=False)(file) for _, file in pending
+            ))
+            checksums = {index: checksum for (index, _), checksum in zip(pending, hashes)}
+            known = {
+                checksum async for checksum in
+                Blob.objects.filter(user=user, checksum__in=set(checksums.values()))
+                .values_list('checksum', flat=True)
+            }
+            to_upload = {}
+            for index, file in pending:
+                if checksums[index] not in known:
+                    to_upload.setdefault(checksums[index], file)
+            
+            uploads, upload_errors = await _upload_to_storage(user, to_upload) if to_upload else ({}, {})
+            
+            stored = []
+            for index, file in pending:
+                if checksums[index] in upload_errors:
+                    results[index] = {'name': file.name, 'success': False, 'error': upload_errors[checksums[index]]}
+                else:
+                    stored.append((index, file))
+            
+            docs = []
+            if stored:
+                sizes = {checksum: file.size for checksum, file in to_upload.items()}
+                docs = await sync_to_async(_save_uploaded_documents)(
+                    user, category, stored, checksums, uploads, sizes, notes, tags
                 )
-                
-                print(f"✅ Documento creado en BD: {doc.id} - {doc.name}")
-                print(f"✅ File field value: {doc.file}")
-                
-                uploaded_docs.append({
-                    'id': doc.id,
-                    'name': doc.name,
-                    'size': doc.get_size_display(),
-                    'icon': doc.get_icon(),
-                    'date': doc.uploaded_at.strftime('%Y-%m-%d'),
-                    'category': category.name if category else 'Sin categoría',
-                    'category_slug': category.name.lower().replace(' ', '-') if category else 'otros'
-                })
             
-            print(f"✅ Subida completada exitosamente. Total: {len(uploaded_docs)} documentos")
+            for (index, file), doc in zip(stored, docs):
+                results[index] = {
+                    'name': file.name,
+                    'success': True,
+                    'document': {
+                        'id': doc.id,
+                        'name': doc.name,
+                        'size': doc.get_size_display(),
+                        'icon': doc.get_icon(),
+                        'date': doc.uploaded_at.strftime('%Y-%m-%d'),
+                        'category': category.name if category else 'Sin categoría',
+                        'category_slug': category.name.lower().replace(' ', '-') if category else 'otros'
+                    }
+                }
+            
+            results = [results[index] for index in range(len(files))]
+            uploaded_docs = [result['document'] for result in results if result['success']]
+            failed = [result for result in results if not result['success']]
+            
+            logger.info('Subida completada', extra={
+                'user_id': user.id,
+                'uploaded': len(uploaded_docs),
+                'failed': len(failed),
+                'new_files': len(uploads),
+            })
+            
+            if not uploaded_docs:
+                return JsonResponse({
+                    'success': False,
+                    'error': failed[0]['error'],
+                    'results': results
+                }, status=400)
             
             return JsonResponse({
                 'success': True,
-                'message': f'Se subieron {len(uploaded_docs)} documentos exitosamente',
-                'documents': uploaded_docs
+                'message': f'Se subieron {len(uploaded_docs)} de {len(files)} documentos',
+                'documents': uploaded_docs,
+                'results': results
             })
             
         except Exception as e:
-            print(f"❌ Error en upload_document: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception('Error en upload_document')
             return JsonResponse({'success': False, 'error': str(e)}, status=400)
     
-    print("❌ Método no permitido")
     return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
 
 @login_required(login_url='login')
-def get_documents(request):
-    """Obtener todos los documentos del usuario"""
+def sign_document_upload(request):
+    """
+    Paso 1 de la subida directa: devuelve los parámetros firmados para que
+    el navegador suba el archivo directamente a Cloudinary.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+
     try:
-        documents = Document.objects.filter(user=request.user).order_by('-uploaded_at')
-        
-        docs_data = []
-        for doc in documents:
-            # Obtener la URL del archivo
-            file_url = None
-            try:
-                # Generar URL de Cloudinary
-                file_url = cloudinary.utils.cloudinary_url(
-                    str(doc.file),
-                    resource_type="raw"
-                )[0]
-            except:
-                file_url = "#"
-            
-            docs_data.append({
-                'id': doc.id,
-                'name': doc.name,
-                'size': doc.get_size_display(),
-                'date': doc.uploaded_at.strftime('%Y-%m-%d'),
-                'icon': doc.get_icon(),
-                'category': doc.category.name if doc.category else 'Sin categoría',
-                'category_slug': doc.category.name.lower().replace(' ', '-') if doc.category else 'otros',
-                'url': file_url
+        data = json.loads(request.body)
+        name = (data.get('name') or '').strip()
+        size = int(data.get('size') or 0)
+
+        if not name:
+            return JsonResponse({'success': False, 'error': 'El nombre es obligatorio'}, status=400)
+        if size > MAX_UPLOAD_SIZE:
+            return JsonResponse({
+                'success': False,
+                'error': f'El archivo {name} es demasiado grande (máximo 100MB)'
+            }, status=400)
+
+        # Si el contenido ya está almacenado no hace falta subirlo otra vez
+        checksum = _clean_checksum(data.get('checksum'))
+        if checksum and Blob.objects.filter(user=request.user, checksum=checksum).exists():
+            return JsonResponse({'success': True, 'duplicate': True})
+
+        # Backends sin subida directa: el navegador usa /api/uploads/
+        if not get_storage().supports_direct_upload:
+            return JsonResponse({'success': True, 'direct': False})
+
+        return JsonResponse({
+            'success': True,
+            **get_storage().sign_upload(_build_public_id(request.user, name)),
+        })
+    except (ValueError, TypeError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+
+@login_required(login_url='login')
+def finalize_document_upload(request):
+    """
+    Paso 2 de la subida directa: registra el Document a partir de la
+    respuesta de Cloudinary, después de verificar su firma.
+
+    La huella SHA-256 la calcula el navegador; como los blobs solo se
+    comparten entre documentos de la misma usuaria, una huella falsa no
+    expone archivos ajenos. Sin `upload`, enlaza el blob ya almacenado.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+
+    try:
+        data = json.loads(request.body)
+        checksum = _clean_checksum(data.get('checksum'))
+        upload = data.get('upload') or {}
+        public_id = upload.get('public_id') or ''
+        version = upload.get('version')
+        category = _resolve_category(request.user, str(data.get('category', 'none')))
+        name = (data.get('name') or upload.get('original_filename') or public_id).strip()
+
+        if not upload:
+            # Contenido duplicado: solo se suma una referencia al blob existente
+            with transaction.atomic():
+                blob = Blob.acquire(request.user, checksum) if checksum else None
+                if blob is None:
+                    return JsonResponse({'success': False, 'error': 'El archivo no está almacenado'}, status=404)
+                doc = _create_document(
+                    request.user, blob, name or 'documento',
+                    category=category, notes=data.get('notes', ''), tags=data.get('tags', '')
+                )
+            return JsonResponse({'success': True, 'document': _serialize_document(doc)})
+
+        # La firma de la respuesta prueba que Cloudinary aceptó este public_id/versión
+        if not public_id or not get_storage().verify_upload(public_id, version, upload.get('signature')):
+            return JsonResponse({'success': False, 'error': 'Firma de subida inválida'}, status=400)
+
+        # Solo se pueden registrar archivos firmados para esta usuaria
+        if not public_id.startswith(f"documents/{request.user.id}_"):
+            return JsonResponse({'success': False, 'error': 'Firma de subida inválida'}, status=403)
+
+        # `bytes` no está cubierto por la firma: el tamaño se pide al almacenamiento
+        size = get_storage().stored_size(public_id)
+
+        if size > MAX_UPLOAD_SIZE:
+            jobs.enqueue_destroy([public_id])
+            return JsonResponse({
+                'success': False,
+                'error': 'El archivo es demasiado grande (máximo 100MB)'
+            }, status=400)
+
+        if (
+            Document.objects.filter(user=request.user, file=public_id).exists() or
+            Blob.objects.filter(user=request.user, public_id=public_id).exists()
+        ):
+            return JsonResponse({'success': False, 'error': 'El archivo ya fue registrado'}, status=409)
+
+        with transaction.atomic():
+            if checksum:
+                blob, created = Blob.register(request.user, checksum, public_id, size)
+                # Otra subida registró el mismo contenido primero
+                if not created:
+                    jobs.enqueue_destroy([public_id])
+                doc = _create_document(
+                    request.user, blob, name,
+                    category=category, notes=data.get('notes', ''), tags=data.get('tags', '')
+                )
+            else:
+                doc = Document.objects.create(
+                    user=request.user,
+                    category=category,
+                    name=name,
+                    file=public_id,
+                    size=size,
+                    notes=data.get('notes', ''),
+                    tags=data.get('tags', ''),
+                    **get_storage().delivery_urls(public_id)
+                )
+                UserStats.record_upload(request.user, [doc])
+                Tag.attach(request.user, [doc], doc.tags)
+                jobs.enqueue_previews([doc])
+
+        return JsonResponse({'success': True, 'document': _serialize_document(doc)})
+    except (ValueError, TypeError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+def _upload_session_response(session, document=None, status=200):
+    """Respuesta JSON de una sesión con las cabeceras estilo tus"""
+    payload = {
+        'success': True,
+        'upload': {
+            'id': str(session.id),
+            'name': session.name,
+            'size': session.size,
+            'offset': session.offset,
+            'chunk_size': settings.CHUNKED_UPLOAD_CHUNK_SIZE,
+        },
+    }
+    if document is not None:
+        payload['document'] = _serialize_document(document)
+    response = JsonResponse(payload, status=status)
+    response['Upload-Offset'] = str(session.offset)
+    response['Upload-Length'] = str(session.size)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def _offset_conflict(session):
+    """409 con el offset del servidor, para que el cliente reanude desde ahí"""
+    response = JsonResponse({
+        'success': False,
+        'error': 'El offset no coincide con el del servidor',
+        'offset': session.offset,
+    }, status=409)
+    response['Upload-Offset'] = str(session.offset)
+    return response
+
+
+def _create_document(user, blob, name, category=None, notes='', tags=''):
+    """Crea el Document que apunta a `blob` y actualiza las estadísticas"""
+    doc = Document.objects.create(
+        user=user,
+        category=category,
+        name=name,
+        file=blob.public_id,
+        blob=blob,
+        checksum=blob.checksum,
+        size=blob.size,
+        notes=notes,
+        tags=tags,
+        **get_storage().delivery_urls(blob.public_id)
+    )
+    UserStats.record_upload(user, [doc])
+    Tag.attach(user, [doc], tags)
+    jobs.enqueue_previews([doc])
+    return doc
+
+
+def _complete_upload_session(session, user):
+    """
+    Sube el archivo ensamblado al almacenamiento (si el contenido es nuevo) y
+    registra el Document de `user`, la dueña de la sesión. Se llama fuera de la transacción de la parte: la
+    subida remota tarda segundos y no debe retener el bloqueo de la fila ni
+    la conexión. Si falla, el cliente repite el PATCH con offset = size y se
+    reintenta; si dos peticiones completan la misma sesión, solo la primera
+    crea el Document.
+    """
+    with open(session.part_path, 'rb') as part:
+        checksum = sha256_file(part)
+
+    public_id = None
+    if not Blob.objects.filter(user=user, checksum=checksum).exists():
+        public_id = get_storage().upload(session.part_path, _build_public_id(user, session.name))
+
+    with transaction.atomic():
+        locked = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if locked.document_id is not None:
+            # Otra petición terminó primero: lo subido aquí sobra
+            if public_id:
+                jobs.enqueue_destroy([public_id])
+            return Document.objects.get(pk=locked.document_id)
+
+        blob = Blob.acquire(user, checksum)
+        if blob is None:
+            if public_id is None:
+                raise ValueError('El contenido se eliminó mientras se completaba la subida; reintenta')
+            blob, created = Blob.register(user, checksum, public_id, session.size)
+            if not created:
+                jobs.enqueue_destroy([public_id])
+        elif public_id:
+            # Otra subida registró el mismo contenido mientras se subía este
+            jobs.enqueue_destroy([public_id])
+
+        doc = _create_document(
+            user,
+            blob,
+            session.name,
+            category=session.category,
+            notes=session.notes,
+            tags=session.tags
+        )
+        session.document = doc
+        session.save(update_fields=['document', 'updated_at'])
+    return doc
+
+
+@login_required(login_url='login')
+def create_upload_session(request):
+    """Inicia una subida reanudable: POST {name, size, category, tags, notes}"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+
+    try:
+        data = json.loads(request.body)
+        name = (data.get('name') or '').strip()
+        size = int(data.get('size') or 0)
+
+        if not name or size <= 0:
+            return JsonResponse({'success': False, 'error': 'Nombre y tamaño son obligatorios'}, status=400)
+        if size > MAX_UPLOAD_SIZE:
+            return JsonResponse({
+                'success': False,
+                'error': f'El archivo {name} es demasiado grande (máximo 100MB)'
+            }, status=400)
+
+        session = UploadSession.objects.create(
+            user=request.user,
+            category=_resolve_category(request.user, str(data.get('category', 'none'))),
+            name=name,
+            size=size,
+            notes=data.get('notes', ''),
+            tags=data.get('tags', '')
+        )
+        response = _upload_session_response(session, status=201)
+        response['Location'] = reverse('upload_session', args=[session.id])
+        return response
+    except (ValueError, TypeError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+
+@login_required(login_url='login')
+def upload_session(request, session_id):
+    """
+    HEAD/GET: offset confirmado de la sesión.
+    PATCH: recibe una parte; la cabecera Upload-Offset debe coincidir con el
+    offset del servidor (si no, 409 con el offset correcto para reanudar).
+    DELETE: cancela la subida.
+    """
+    if request.method in ('GET', 'HEAD'):
+        try:
+            session = UploadSession.objects.get(id=session_id, user=request.user)
+        except UploadSession.DoesNotExist:
+            return JsonResponse({'success': False, 'error': 'Subida no encontrada'}, status=404)
+        return _upload_session_response(session, document=session.document)
+
+    if request.method == 'DELETE':
+        try:
+            session = UploadSession.objects.get(id=session_id, user=request.user, document__isnull=True)
+        except UploadSession.DoesNotExist:
+            return JsonResponse({'success': False, 'error': 'Subida no encontrada'}, status=404)
+        session.discard_data()
+        session.delete()
+        return JsonResponse({'success': True})
+
+    if request.method != 'PATCH':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        length = int(request.headers.get('Content-Length') or 0)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Upload-Offset inválido'}, status=400)
+
+    if length > settings.CHUNKED_UPLOAD_CHUNK_SIZE:
+        return JsonResponse({
+            'success': False,
+            'error': f'Cada parte puede tener como máximo {settings.CHUNKED_UPLOAD_CHUNK_SIZE} bytes'
+        }, status=413)
+
+    try:
+        # La parte se recibe antes de bloquear la fila: la transferencia por la
+        # red no retiene el bloqueo ni la conexión a la BD. Cabe en memoria
+        # porque está acotada por CHUNKED_UPLOAD_CHUNK_SIZE.
+        chunk = request.read(length)
+
+        # El bloqueo de fila serializa las partes de una misma sesión
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(id=session_id, user=request.user)
+            if session.document_id:
+                return _upload_session_response(session, document=session.document)
+            received = session.received_bytes()
+            if received != session.offset:
+                # La parte en disco no coincide: reanudar desde lo que realmente hay
+                logger.warning('Parte de subida incompleta', extra={
+                    'session_id': str(session.id), 'offset': session.offset, 'received': received,
+                })
+                session.offset = received
+                session.save(update_fields=['offset', 'updated_at'])
+                return _offset_conflict(session)
+            if offset != session.offset:
+                return _offset_conflict(session)
+            if offset + len(chunk) > session.size:
+                return JsonResponse({'success': False, 'error': 'La parte excede el tamaño declarado'}, status=400)
+
+            session.offset += session.write_chunk(io.BytesIO(chunk), len(chunk))
+            session.save(update_fields=['offset', 'updated_at'])
+
+        # El offset final ya está confirmado: la subida al almacenamiento va sin bloqueo
+        document = None
+        if session.is_complete:
+            document = _complete_upload_session(session, request.user)
+            session.discard_data()
+        return _upload_session_response(session, document=document)
+    except UploadSession.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Subida no encontrada'}, status=404)
+    except Exception as e:
+        logger.exception('Error en upload_session')
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+# Documentos que muestra la sección "Recientes" (de los últimos 7 días)
+RECENT_DOCUMENTS = 10
+
+# Campos que necesitan los listados de documentos (evita traer notes/tags)
+DOCUMENT_LIST_FIELDS = (
+    'id', 'name', 'size', 'uploaded_at', 'file', 'delivery_url', 'preview', 'preview_url', 'category__name'
+)
+
+
+def _document_list_queryset(user):
+    """Queryset base para los listados: un solo JOIN con categories y proyección mínima"""
+    return (
+        Document.objects.filter(user=user)
+        .select_related('category')
+        .only(*DOCUMENT_LIST_FIELDS)
+    )
+
+
+def _serialize_document(doc):
+    """Convierte un documento en el dict que consumen los listados del frontend"""
+    # URL guardada al subir (o firmada desde el caché del backend)
+    storage = get_storage()
+    try:
+        file_url = storage.url(doc)
+    except:
+        file_url = "#"
+
+    return {
+        'id': doc.id,
+        'name': doc.name,
+        'size': doc.get_size_display(),
+        'date': doc.uploaded_at.strftime('%Y-%m-%d'),
+        'icon': doc.get_icon(),
+        'category': doc.category.name if doc.category else 'Sin categoría',
+        'category_slug': doc.category.name.lower().replace(' ', '-') if doc.category else 'otros',
+        'url': file_url,
+        # Miniatura WebP; vacía mientras se genera o si el tipo de archivo no tiene
+        'preview_url': storage.preview_url(doc) if doc.preview else '',
+    }
+
+
+def _serialize_category(category):
+    return {
+        'id': category.id,
+        'name': category.name,
+        'icon': category.icon,
+        'document_count': category.document_count()
+    }
+
+
+def _bootstrap_payload(user):
+    """
+    Todo lo que el panel necesita al cargar, en tres consultas: estadísticas,
+    categorías con su número de documentos, documentos recientes y la
+    primera página de la biblioteca (con `next_cursor` para seguir).
+    """
+    # Estadísticas materializadas: una sola búsqueda por clave primaria
+    stats = UserStats.for_user(user)
+    categories = list(
+        Category.objects.filter(user=user)
+        .with_document_count()
+        .order_by('-created_at')
+    )
+    page, next_cursor = keyset_page(_document_list_queryset(user), limit=DEFAULT_PAGE_SIZE)
+
+    # Recientes = los primeros de la página (mismo orden) de los últimos 7 días
+    seven_days_ago = timezone.now() - timedelta(days=7)
+    recent = [doc for doc in page[:RECENT_DOCUMENTS] if doc.uploaded_at >= seven_days_ago]
+    documents = [_serialize_document(doc) for doc in page]
+
+    return {
+        'stats': {
+            'total_documents': stats.document_count,
+            'total_categories': len(categories),
+            'documents_today': stats.documents_today,
+            'size_display': stats.get_size_display(),
+        },
+        'categories': [
+            _serialize_category(category)
+            for category in sorted(categories, key=lambda category: category.name)
+        ],
+        'recent_documents': documents[:len(recent)],
+        'documents': documents,
+        'next_cursor': next_cursor,
+        # Solo para la grilla de categorías que se dibuja en el servidor
+        'category_grid': categories,
+    }
+
+
+@login_required(login_url='login')
+@cache_library_response
+async def bootstrap(request):
+    """Los mismos datos iniciales que trae /platform/, para refrescar el panel"""
+    try:
+        user = await request.auser()
+        payload = await sync_to_async(_bootstrap_payload)(user)
+        del payload['category_grid']
+        return JsonResponse({'success': True, **payload})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+
+@login_required(login_url='login')
+@cache_library_response
+async def get_documents(request):
+    """
+    Obtener los documentos del usuario.
+
+    Sin parámetros devuelve toda la biblioteca en streaming. Con ?limit= y/o
+    ?cursor= devuelve una página (keyset sobre uploaded_at, id) junto con
+    `next_cursor` para pedir la siguiente. ?tag=a,b filtra los documentos
+    que tienen todas esas etiquetas.
+    """
+    try:
+        user = await request.auser()
+        documents = _document_list_queryset(user)
+
+        for tag_name in parse_tags(request.GET.get('tag')):
+            documents = documents.filter(tag_objects__name=tag_name)
+
+        if 'limit' in request.GET or 'cursor' in request.GET:
+            limit = parse_page_size(request.GET.get('limit'))
+            page, next_cursor = await sync_to_async(keyset_page)(
+                documents,
+                cursor=request.GET.get('cursor'),
+                limit=limit
+            )
+            return JsonResponse({
+                'success': True,
+                'documents': [_serialize_document(doc) for doc in page],
+                'next_cursor': next_cursor,
             })
-        
-        return JsonResponse({'success': True, 'documents': docs_data})
+
+        documents = documents.order_by('-uploaded_at', '-id')
+        # Bajo WSGI la respuesta se recorre en el hilo de la petición: un
+        # iterador async obligaría a Django a consumirlo en memoria
+        if isinstance(request, ASGIRequest):
+            return StreamingJsonResponse(documents.aiterator(chunk_size=500), _serialize_document)
+        return StreamingJsonResponse(documents.iterator(chunk_size=500), _serialize_document)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 @login_required(login_url='login')
-def get_recent_documents(request):
+@cache_library_response
+async def get_recent_documents(request):
     """Obtener documentos recientes (últimos 7 días)"""
     try:
+        user = await request.auser()
         seven_days_ago = timezone.now() - timedelta(days=7)
-        documents = Document.objects.filter(
-            user=request.user,
+        documents = _document_list_queryset(user).filter(
             uploaded_at__gte=seven_days_ago
-        ).order_by('-uploaded_at')[:10]  # Últimos 10 documentos
-        
+        ).order_by('-uploaded_at', '-id')[:RECENT_DOCUMENTS]
+
+        # Lista acotada: respuesta normal, que cache_library_response puede guardar
+        return JsonResponse({'success': True, 'documents': [_serialize_document(doc) async for doc in documents]})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+@login_required(login_url='login')
+def search_documents(request):
+    """
+    Búsqueda de texto completo en nombre, etiquetas y notas:
+    ?q=<texto>&page=<n>&limit=<n>, resultados ordenados por relevancia.
+    """
+    try:
+        query = request.GET.get('q', '').strip()
+        limit = parse_page_size(request.GET.get('limit'))
+        page = max(1, int(request.GET.get('page') or 1))
+
+        offset = (page - 1) * limit
+        results = list(
+            search.search_documents(request.user, query)
+            .select_related('category')
+            .only(*DOCUMENT_LIST_FIELDS)[offset:offset + limit + 1]
+        )
+
         docs_data = []
-        for doc in documents:
-            # Obtener la URL del archivo
-            file_url = None
-            try:
-                file_url = cloudinary.utils.cloudinary_url(
-                    str(doc.file),
-                    resource_type="raw"
-                )[0]
-            except:
-                file_url = "#"
-            
-            docs_data.append({
-                'id': doc.id,
-                'name': doc.name,
-                'size': doc.get_size_display(),
-                'date': doc.uploaded_at.strftime('%Y-%m-%d'),
-                'icon': doc.get_icon(),
-                'category': doc.category.name if doc.category else 'Sin categoría',
-                'category_slug': doc.category.name.lower().replace(' ', '-') if doc.category else 'otros',
-                'url': file_url
-            })
-        
-        return JsonResponse({'success': True, 'documents': docs_data})
+        for doc in results[:limit]:
+            data = _serialize_document(doc)
+            data['rank'] = getattr(doc, 'rank', None)
+            docs_data.append(data)
+
+        return JsonResponse({
+            'success': True,
+            'query': query,
+            'page': page,
+            'has_more': len(results) > limit,
+            'documents': docs_data,
+        })
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 @login_required(login_url='login')
-def download_document(request, document_id):
-    """Descargar un documento - VERSIÓN SIMPLIFICADA Y FUNCIONAL"""
+def get_user_tags(request):
+    """Etiquetas del usuario con su número de documentos (una sola consulta agrupada)"""
     try:
-        document = Document.objects.get(id=document_id, user=request.user)
-        
-        print(f"📥 Descargando documento: {document.name}")
-        
-        # OPCIÓN 1: Usar la URL directa del campo Cloudinary y modificarla
-        if hasattr(document.file, 'url'):
-            file_url = document.file.url
-            
-            # Verificar si ya es una URL de Cloudinary
-            if 'res.cloudinary.com' in file_url:
-                # Insertar fl_attachment después de /upload/ para forzar descarga
-                if '/upload/' in file_url:
-                    # Reemplazar solo la primera ocurrencia
-                    parts = file_url.split('/upload/', 1)
-                    download_url = parts[0] + '/upload/fl_attachment/' + parts[1]
-                    
-                    # Asegurarse de que no haya duplicación de 'documents/'
-                    download_url = download_url.replace('/documents/documents/', '/documents/')
-                    
-                    print(f"🔗 URL generada: {download_url}")
-                    return redirect(download_url)
-        
-        # OPCIÓN 2: Si no funciona la opción 1, construir URL manualmente
-        cloud_name = 'def1jabap'  # Tu cloud name
-        
-        # Obtener el public_id correctamente
-        if hasattr(document.file, 'public_id'):
-            public_id = document.file.public_id
-        else:
-            public_id = str(document.file)
-        
-        print(f"📥 Public ID: {public_id}")
-        
-        # Limpiar el public_id - quitar prefijos innecesarios
-        if public_id.startswith('v1/'):
-            public_id = public_id[3:]  # Remover "v1/"
-        
-        # Asegurarse de que solo tenga un prefijo "documents/"
-        if public_id.startswith('documents/'):
-            # Ya tiene el prefijo correcto
-            clean_public_id = public_id
-        else:
-            # Agregar el prefijo
-            clean_public_id = f"documents/{public_id}"
-        
-        print(f"📥 Clean Public ID: {clean_public_id}")
-        
-        # Construir URL directa para descarga
-        download_url = f"https://res.cloudinary.com/{cloud_name}/raw/upload/fl_attachment/{clean_public_id}"
+        tags = (
+            Tag.objects.filter(user=request.user)
+            .annotate(document_count=Count('document_tags'))
+            .filter(document_count__gt=0)
+            .order_by('-document_count', 'name')
+            .values('name', 'document_count')
+        )
+        return JsonResponse({'success': True, 'tags': list(tags)})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+
+@login_required(login_url='login')
+async def download_document(request, document_id):
+    """Descargar un documento a través del backend de almacenamiento configurado"""
+    try:
+        user = await request.auser()
+        document = await Document.objects.only('id', 'name', 'file', 'checksum', 'download_url').aget(
+            id=document_id, user=user
+        )
         
-        print(f"🔗 URL final: {download_url}")
-        return redirect(download_url)
+        logger.debug('Descargando documento', extra={'document_id': document.id})
+        response = await sync_to_async(get_storage().download_response, thread_sensitive=False)(request, document)
+        return stream_without_blocking(response) if isinstance(request, ASGIRequest) else response
         
     except Document.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Documento no encontrado'}, status=404)
     except Exception as e:
-        print(f"❌ Error al descargar documento: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception('Error al descargar documento')
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
+# Máximo de ids por exportación de una selección (la de una categoría no tiene límite)
+MAX_EXPORT_IDS = 1000
+
+
 @login_required(login_url='login')
-def delete_document(request, document_id):
+async def export_documents(request):
+    """
+    Descargar varios documentos en un ZIP que se arma mientras se envía:
+    GET ?category=<id> o ?ids=1,2,3
+    """
+    try:
+        user = await request.auser()
+        documents = Document.objects.filter(user=user)
+        filename = 'documentos'
+
+        if request.GET.get('category'):
+            category = await Category.objects.only('id', 'name').filter(
+                id=int(request.GET['category']), user=user
+            ).afirst()
+            if category is None:
+                return JsonResponse({'success': False, 'error': 'Categoría no encontrada'}, status=404)
+            documents = documents.filter(category=category)
+            filename = category.name
+        else:
+            ids = list(dict.fromkeys(int(doc_id) for doc_id in request.GET.get('ids', '').split(',') if doc_id.strip()))
+            if not ids:
+                return JsonResponse({'success': False, 'error': 'Indica ids o category'}, status=400)
+            if len(ids) > MAX_EXPORT_IDS:
+                return JsonResponse({
+                    'success': False,
+                    'error': f'Máximo {MAX_EXPORT_IDS} documentos por exportación'
+                }, status=400)
+            documents = documents.filter(id__in=ids)
+
+        # Se leen antes de empezar: los hilos del ZIP no usan la BD
+        documents = [
+            doc async for doc in documents.only('id', 'name', 'file', 'size', 'uploaded_at').order_by('-uploaded_at', '-id')
+        ]
+        if not documents:
+            return JsonResponse({'success': False, 'error': 'No hay documentos para exportar'}, status=404)
+
+        logger.info('Exportando documentos', extra={'user_id': user.id, 'documents': len(documents)})
+        response = StreamingHttpResponse(exports.zip_documents(documents), content_type='application/zip')
+        response['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(filename)}.zip"
+        return stream_without_blocking(response) if isinstance(request, ASGIRequest) else response
+
+    except (ValueError, TypeError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except Exception as e:
+        logger.exception('Error al exportar documentos')
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+@login_required(login_url='login')
+async def document_preview(request, document_id):
+    """Miniatura WebP del documento (redirige al CDN o la sirve desde el disco)"""
+    try:
+        user = await request.auser()
+        document = await Document.objects.only('id', 'preview', 'preview_url').aget(
+            id=document_id, user=user
+        )
+        if not document.preview:
+            raise Document.DoesNotExist
+        response = await sync_to_async(get_storage().preview_response, thread_sensitive=False)(request, document)
+        return stream_without_blocking(response) if isinstance(request, ASGIRequest) else response
+    except (Document.DoesNotExist, FileNotFoundError):
+        return JsonResponse({'success': False, 'error': 'Vista previa no disponible'}, status=404)
+
+@login_required(login_url='login')
+async def delete_document(request, document_id):
     """Eliminar un documento"""
     if request.method == 'DELETE':
         try:
-            document = Document.objects.get(id=document_id, user=request.user)
-            
-            # Eliminar de Cloudinary primero
-            try:
-                cloudinary.uploader.destroy(str(document.file), resource_type="raw")
-                print(f"🗑️  Archivo eliminado de Cloudinary: {document.file}")
-            except Exception as e:
-                print(f"⚠️  No se pudo eliminar de Cloudinary (puede que ya no exista): {e}")
+            user = await request.auser()
             
-            # Eliminar de la base de datos
-            document.delete()
+            # Eliminar de la base de datos y liberar la referencia al contenido; el
+            # archivo se borra del almacenamiento en segundo plano (run_jobs),
+            # solo cuando ningún otro documento lo usa
+            deleted = await sync_to_async(_delete_documents)(user, Document.objects.filter(id=document_id))
+            if not deleted:
+                return JsonResponse({'success': False, 'error': 'Documento no encontrado'}, status=404)
             
             return JsonResponse({'success': True, 'message': 'Documento eliminado'})
-        except Document.DoesNotExist:
-            return JsonResponse({'success': False, 'error': 'Documento no encontrado'}, status=404)
         except Exception as e:
-            print(f"❌ Error al eliminar documento: {e}")
+            logger.exception('Error al eliminar documento')
             return JsonResponse({'success': False, 'error': str(e)}, status=400)
     
     return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
 
+# Máximo de documentos por petición de eliminación múltiple
+MAX_BULK_DELETE = 1000
+
+
+def _delete_documents(user, documents):
+    """
+    Elimina los documentos del queryset (ya acotado a `user`) con un solo
+    DELETE y encola, en lotes, el borrado de los archivos que quedaron sin
+    referencias cuando se confirma la transacción (la propia o la de quien
+    llama). Retorna el resultado por documento.
+    """
+    with transaction.atomic():
+        docs = list(
+            documents.filter(user=user)
+            .select_for_update()
+            .only('id', 'file', 'size', 'uploaded_at', 'blob', 'preview')
+        )
+        public_ids = []
+        if docs:
+            Document.objects.filter(user=user, pk__in=[doc.id for doc in docs]).delete()
+            UserStats.record_delete(user, docs)
+            public_ids = Blob.release_many(Counter(doc.blob_id for doc in docs if doc.blob_id))
+            public_ids += [str(doc.file) for doc in docs if not doc.blob_id]
+            # La miniatura se va con el último documento que usa el archivo
+            previews = {str(doc.file): doc.preview for doc in docs if doc.preview}
+            public_ids += [previews[public_id] for public_id in public_ids if public_id in previews]
+            if public_ids:
+                transaction.on_commit(lambda: jobs.enqueue_destroy(public_ids))
+    
+    logger.info('Documentos eliminados', extra={
+        'user_id': user.id,
+        'documents': len(docs),
+        'files_to_destroy': len(public_ids),
+    })
+    return [{'id': doc.id, 'success': True} for doc in docs]
+
+
+@login_required(login_url='login')
+async def bulk_delete_documents(request):
+    """Eliminar varios documentos: POST {ids: [...]} o {category: id}"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+    
+    try:
+        user = await request.auser()
+        data = json.loads(request.body or '{}')
+        
+        if data.get('category') is not None:
+            category = await Category.objects.filter(id=int(data['category']), user=user).afirst()
+            if category is None:
+                return JsonResponse({'success': False, 'error': 'Categoría no encontrada'}, status=404)
+            results = await sync_to_async(_delete_documents)(user, category.documents.all())
+        else:
+            ids = list(dict.fromkeys(int(doc_id) for doc_id in data.get('ids') or []))
+            if not ids:
+                return JsonResponse({'success': False, 'error': 'Indica ids o category'}, status=400)
+            if len(ids) > MAX_BULK_DELETE:
+                return JsonResponse({
+                    'success': False,
+                    'error': f'Máximo {MAX_BULK_DELETE} documentos por petición'
+                }, status=400)
+            
+            # Resultados en el mismo orden de los ids recibidos
+            deleted = await sync_to_async(_delete_documents)(user, Document.objects.filter(id__in=ids))
+            found = {result['id']: result for result in deleted}
+            results = [
+                found.get(doc_id) or {'id': doc_id, 'success': False, 'error': 'Documento no encontrado'}
+                for doc_id in ids
+            ]
+        
+        return JsonResponse({
+            'success': True,
+            'deleted': sum(1 for result in results if result['success']),
+            'results': results,
+        })
+    except (ValueError, TypeError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except Exception as e:
+        logger.exception('Error en eliminación múltiple')
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+def metrics(request):
+    """Métricas del proceso en formato de texto de Prometheus"""
+    token = settings.METRICS_TOKEN
+    # Sin token, las métricas quedan públicas: solo se permite con DEBUG
+    if not settings.METRICS_ENABLED or not (token or settings.DEBUG):
+        raise Http404
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def run_jobs(request):
+    """
+    Ejecuta trabajos pendientes de la cola (borrados, miniaturas) cuando no
+    hay un worker con `manage.py run_jobs`: la llama el cron de vercel.json.
+    """
+    secret = settings.JOBS_CRON_SECRET
+    if not secret:
+        raise Http404
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {secret}'):
+        return HttpResponse(status=401)
+    done, failed = jobs.run_pending(concurrency=settings.JOBS_WORKER_CONCURRENCY, limit=settings.JOBS_CRON_LIMIT)
+    return JsonResponse({'success': True, 'done': done, 'failed': failed})
+
 @login_required(login_url='login')
 def test_document_url(request, document_id):
     """Función de diagnóstico para probar URLs de documentos"""
@@ -517,6 +1215,7 @@ def test_document_url(request, document_id):
         
         # Diferentes formas de generar URLs
         urls = []
+        cloudinary = cloudinary_sdk()
         
         # Método 1: cloudinary.utils.cloudinary_url básico
         try: